@@ -0,0 +1,336 @@
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import cache
+import leitor
+import main
+import searchByTerm
+
+#
+#   Benchmark do pipeline de extração e da busca
+#   Gera um acervo sintético e reprodutível de PDFs parecidos com artigos
+#   (com frases que casam com as gramáticas dos extratores), mede cada
+#   etapa separadamente e compara com um baseline salvo anteriormente
+#
+
+TOPICS = ['image compression', 'network security', 'energy efficiency', 'sensor networks',
+          'cloud storage', 'neural networks', 'video coding', 'access control',
+          'query processing', 'wireless protocols', 'data mining', 'cryptographic hashing']
+
+NOUNS = ['method', 'approach', 'framework', 'model', 'system', 'protocol', 'algorithm',
+         'scheme', 'technique', 'architecture']
+
+ADJECTIVES = ['new', 'efficient', 'robust', 'scalable', 'lightweight', 'novel', 'secure',
+              'adaptive', 'comparative', 'well-known']
+
+# Modelos de frase, cada um pensado para casar com uma das ChunkRule
+TEMPLATES = [
+    # objetivo
+    'In this paper we present a {adj} {noun} for {topic}.',
+    'This paper proposes a {adj} {noun} for {topic}.',
+    'We propose a {adj} {noun} to improve {topic}.',
+    'The {noun} is proposed to handle {topic}.',
+    # problema
+    'The {adj} problem of {topic} remains open.',
+    'Existing systems lack {adj} support for {topic}.',
+    'This can prevent the adoption of {topic}.',
+    'By solving the {noun} issue we reduce the cost of {topic}.',
+    # metodologia
+    'A comparative analysis of several {adj} {noun}s is presented.',
+    'Using the {noun} methodology we evaluate {topic}.',
+    'We investigate the {adj} performance of {topic}.',
+    'The results are evaluated and compared to the state of the art.',
+    'Experiments are conducted in this paper on {topic}.',
+    # contribuições
+    'The main contribution of this paper is a {adj} {noun}.',
+    'Based on the results of the experiments the {noun} performs well.',
+    'The {noun} gives similar security with lower cost.',
+    # frases neutras
+    'Table {n} shows the configuration used for {topic}.',
+    'Several works studied {topic} in the last decade.',
+    'The {noun} was implemented in {n} lines of code.',
+    'Each experiment was repeated {n} times to reduce noise.',
+]
+
+LINES_PER_PAGE = 40
+CHARS_PER_LINE = 90
+
+
+def sentence(rng: random.Random) -> str:
+    return rng.choice(TEMPLATES).format(adj=rng.choice(ADJECTIVES), noun=rng.choice(NOUNS),
+                                        topic=rng.choice(TOPICS), n=rng.randint(2, 99))
+
+
+def synthetic_paper(rng: random.Random, sentences: int, references: int) -> str:
+    title = '%s %s for %s' % (rng.choice(ADJECTIVES).title(), rng.choice(NOUNS).title(),
+                              rng.choice(TOPICS).title())
+
+    body = ' '.join(sentence(rng) for _ in range(sentences))
+    refs = '\n'.join('[%d] A. Author and B. Author, "%s", Proc. Conf., %d.' % (
+        i + 1, sentence(rng), rng.randint(1990, 2023)) for i in range(references))
+
+    return '%s\nA. Author, B. Author\nAbstract\n%s\nReferences\n%s\n' % (title, body, refs)
+
+
+def _escape(line: str) -> str:
+    return line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def write_pdf(path: str, text: str):
+    #
+    #   Escreve um PDF mínimo (uma fonte Helvetica e um fluxo de texto por
+    #   página), suficiente para o PyPDF2 extrair o texto de volta
+    #
+    lines = []
+
+    for paragraph in text.split('\n'):
+        while len(paragraph) > CHARS_PER_LINE:
+            cut = paragraph.rfind(' ', 0, CHARS_PER_LINE)
+            cut = cut if cut > 0 else CHARS_PER_LINE
+            lines.append(paragraph[:cut])
+            paragraph = paragraph[cut:].lstrip()
+
+        lines.append(paragraph)
+
+    pages = [lines[i:i + LINES_PER_PAGE]
+             for i in range(0, len(lines), LINES_PER_PAGE)] or [[]]
+
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        ('<< /Type /Pages /Kids [%s] /Count %d >>' % (
+            ' '.join('%d 0 R' % (4 + 2 * i) for i in range(len(pages))), len(pages))).encode(),
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+    ]
+
+    for i, page in enumerate(pages):
+        content = 'BT /F1 10 Tf 12 TL 50 760 Td ' + \
+            ' '.join('(%s) Tj T*' % _escape(line) for line in page) + ' ET'
+        stream = content.encode('latin-1', 'replace')
+
+        objects.append(('<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+                        '/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>' % (5 + 2 * i)).encode())
+        objects.append(b'<< /Length %d >>\nstream\n' % len(stream) + stream + b'\nendstream')
+
+    output = b'%PDF-1.4\n'
+    offsets = []
+
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b'%d 0 obj\n' % number + obj + b'\nendobj\n'
+
+    xref = len(output)
+    output += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    output += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    output += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (
+        len(objects) + 1, xref)
+
+    with open(path, 'wb') as file:
+        file.write(output)
+
+
+def generate_corpus(directory: str, papers: int, sentences: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    paths = []
+
+    for i in range(papers):
+        path = os.path.join(directory, 'paper_%04d.pdf' % i)
+        write_pdf(path, synthetic_paper(rng, sentences, references=sentences // 10 + 5))
+        paths.append(path)
+
+    return paths
+
+
+class Timer:
+    def __init__(self):
+        self.stages: dict[str, float] = dict()
+
+    def run(self, stage: str, function, *args, **kwargs):
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        self.stages[stage] = self.stages.get(stage, 0.0) + time.perf_counter() - start
+
+        return result
+
+
+def run_pipeline(paths: list[str], timer: Timer) -> int:
+    total_sentences = 0
+
+    for path in paths:
+        text = timer.run('extrair_texto', leitor.extrair_texto, path)
+        paper = timer.run('ScyPaper.__init__', main.ScyPaper, text)
+        total_sentences += len(paper.sentences)
+
+        timer.run('count_words', paper.count_words, paper.text)
+        # inclui a etiquetagem das frases que passam pelo pré-filtro
+        timer.run('find_candidates', paper.find_candidates)
+        timer.run('search_for_contribuitions', paper.search_for_contribuitions)
+        timer.run('search_for_objective', paper.search_for_objective)
+        timer.run('search_for_problem', paper.search_for_problem)
+        timer.run('search_for_methods', paper.search_for_methods)
+        timer.run('write_to_file', main.write_to_file, path, paper)
+
+    return total_sentences
+
+
+def run_search(directory: str, queries: list[str], timer: Timer):
+    searchByTerm._indexes.clear()
+
+    timer.run('search_by_term (cold)', searchByTerm.search_by_term, queries[0], directory)
+
+    for query in queries:
+        timer.run('search_by_term', searchByTerm.search_by_term, query, directory)
+
+    timer.stages['search_by_term'] /= len(queries)
+
+
+def benchmark(papers: int, sentences: int, seed: int, queries: list[str]) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        # cache de extração vazio, para medir a decodificação dos PDFs
+        cache.configure_cache(os.path.join(directory, '.extraction-cache'))
+
+        paths = generate_corpus(directory, papers, sentences, seed)
+
+        timer = Timer()
+
+        start = time.perf_counter()
+        total_sentences = run_pipeline(paths, timer)
+        elapsed = time.perf_counter() - start
+
+        run_search(directory, queries, timer)
+
+        # segunda passada, com o cache de extração já populado, medindo a memória
+        tracemalloc.start()
+        run_pipeline(paths, Timer())
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {
+        'papers': papers,
+        'sentences': total_sentences,
+        'stages': timer.stages,
+        'papers_per_second': papers / elapsed,
+        'sentences_per_second': total_sentences / elapsed,
+        'peak_memory_mb': peak / 1024 ** 2,
+    }
+
+
+def best_of(runs: list[dict]) -> dict:
+    #
+    #   Combina várias execuções do mesmo tamanho mantendo, para cada etapa,
+    #   o menor tempo. O mínimo é o valor menos afetado por ruído (outros
+    #   processos, frequência da CPU), já que o ruído só aumenta o tempo
+    #
+    best = dict(runs[0])
+    best['stages'] = {stage: min(run['stages'][stage] for run in runs)
+                      for stage in runs[0]['stages']}
+    best['papers_per_second'] = max(run['papers_per_second'] for run in runs)
+    best['sentences_per_second'] = max(run['sentences_per_second'] for run in runs)
+    best['peak_memory_mb'] = min(run['peak_memory_mb'] for run in runs)
+    best['repeat'] = len(runs)
+
+    return best
+
+
+def compare(results: dict, baseline: dict, tolerance: float, min_delta: float = 0.0) -> list[str]:
+    #
+    #   Compara os tempos de cada etapa com o baseline e retorna as
+    #   regressões acima da tolerância (ex: 0.2 = 20% mais lento)
+    #   Etapas que ficaram menos de min_delta segundos mais lentas são
+    #   ignoradas: em etapas de poucos milissegundos o ruído sozinho
+    #   passa da tolerância relativa
+    #
+    regressions = []
+
+    for size, result in results.items():
+        previous = baseline.get(size)
+
+        if previous is None:
+            continue
+
+        for stage, seconds in result['stages'].items():
+            before = previous['stages'].get(stage)
+
+            if before and seconds > before * (1 + tolerance) and seconds - before >= min_delta:
+                regressions.append('%s papers, %s: %.4fs -> %.4fs (+%.0f%%)' % (
+                    size, stage, before, seconds, (seconds / before - 1) * 100))
+
+        if result['peak_memory_mb'] > previous['peak_memory_mb'] * (1 + tolerance):
+            regressions.append('%s papers, peak memory: %.1fMB -> %.1fMB' % (
+                size, previous['peak_memory_mb'], result['peak_memory_mb']))
+
+    return regressions
+
+
+def show(results: dict):
+    for size, result in results.items():
+        print('\n== %s papers, %d sentences ==' % (size, result['sentences']))
+
+        for stage, seconds in result['stages'].items():
+            print('%-28s %10.4fs' % (stage, seconds))
+
+        print('%-28s %10.2f' % ('papers/s', result['papers_per_second']))
+        print('%-28s %10.2f' % ('sentences/s', result['sentences_per_second']))
+        print('%-28s %10.1fMB' % ('peak memory', result['peak_memory_mb']))
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description='Benchmark do pipeline de extração e da busca')
+
+    parser.add_argument('--sizes', default='5,20',
+                        help='tamanhos do acervo (número de artigos), separados por vírgula')
+    parser.add_argument('--sentences', type=int, default=200,
+                        help='frases por artigo')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='salva os resultados em JSON')
+    parser.add_argument('--baseline', help='JSON de uma execução anterior para comparação')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='aumento relativo tolerado antes de acusar regressão')
+    parser.add_argument('--min-delta', type=float, default=0.005,
+                        help='aumento mínimo, em segundos, para uma etapa ser considerada regressão')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='execuções de cada tamanho, mantendo o menor tempo de cada etapa')
+
+    return parser.parse_args(argv)
+
+
+def run(argv: list[str]) -> int:
+    args = parse_args(argv)
+
+    queries = ['security', 'image compression', 'neural networks energy', 'protocol']
+
+    results = {size: best_of([benchmark(int(size), args.sentences, args.seed, queries)
+                              for _ in range(max(1, args.repeat))])
+               for size in args.sizes.split(',')}
+
+    show(results)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r') as file:
+            regressions = compare(results, json.load(file), args.tolerance, args.min_delta)
+
+        if regressions:
+            print('\nRegressões em relação ao baseline:')
+
+            for regression in regressions:
+                print('  ' + regression)
+
+            return 1
+
+        print('\nSem regressões em relação ao baseline')
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(run(sys.argv[1:]))
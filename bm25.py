@@ -1,39 +1,244 @@
+from collections import Counter
+
 import numpy as np
 
 from text import (composite, remove_punctuation, remove_stop_words,
                   to_lemmatize, to_stem, to_tokenized)
 
+K = 2.0
+B = 0.75
+
+# Preparação padrão dos textos usada no BM25 e no índice invertido
+prepare = composite(
+    to_tokenized,
+    remove_stop_words,
+    remove_punctuation,
+    to_lemmatize,
+    to_stem
+)
+
+
+def term_score(tf: int, doc_len: int, avg_words: float) -> float:
+    return tf * (K + 1) / (tf + K * (1 - B + B * doc_len / avg_words))
+
+
+def idf_weight(num_docs: int, df: int) -> float:
+    return float(np.log((num_docs - df + 0.5) / (df + 0.5) + 1))
+
 
 #
 #   Implentação da função BM25 sem considerar o IDF
 #
 def bm25_no_idf(corpus: list[str], doc: str, query: str, **kwargs) -> float:
-    K = 2.0
-    B = 0.75
-
     def term_freq(words: list[str], term: str) -> int:
         return words.count(term)
 
-    prepare = composite(
-        to_tokenized,
-        remove_stop_words,
-        remove_punctuation,
-        to_lemmatize,
-        to_stem
-    )
-
     words = prepare(doc)
     query = prepare(query)
 
     points = 0
 
-    avg_words = kwargs.get('avg_words',  np.mean(
-        [len(prepare(d)) for d in corpus]))
+    avg_words = kwargs.get('avg_words')
+
+    if avg_words is None:
+        avg_words = np.mean([len(prepare(d)) for d in corpus])
 
     for q in query:
         tf = term_freq(words, q)
 
-        points += tf * (K + 1) / (tf + K *
-                                  (1 - B + B * len(words) / avg_words))
+        points += term_score(tf, len(words), avg_words)
 
     return points
+
+
+#
+#   Vocabulário guardado como um vetor ordenado de termos de tamanho fixo
+#   (codificados em UTF-8), como o do índice mapeado em memória. A busca
+#   de um termo é binária e não exige montar um dicionário com todos eles
+#
+class SortedVocabulary:
+    terms: np.ndarray
+
+    def __init__(self, terms: np.ndarray):
+        self.terms = terms
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def get(self, term: str, default: int | None = None) -> int | None:
+        key = term.encode('utf-8')
+
+        if not len(self.terms) or len(key) > self.terms.dtype.itemsize:
+            return default
+
+        col = int(np.searchsorted(self.terms, key))
+
+        if col < len(self.terms) and self.terms[col] == key:
+            return col
+
+        return default
+
+
+#
+#   BM25 vetorizado
+#   Os documentos são preparados uma única vez e as frequências ficam em
+#   uma matriz esparsa documento-termo armazenada por coluna (termo):
+#   para o termo de coluna c, indices[indptr[c]:indptr[c+1]] são os
+#   documentos que o contém e data[indptr[c]:indptr[c+1]] as frequências
+#
+class BM25:
+    vocabulary: dict[str, int] | SortedVocabulary
+    indptr: np.ndarray
+    indices: np.ndarray
+    data: np.ndarray
+    doc_len: np.ndarray
+    avg_words: float
+    idf: bool
+
+    def __init__(self, vocabulary: dict[str, int] | SortedVocabulary, indptr: np.ndarray, indices: np.ndarray,
+                 data: np.ndarray, doc_len: np.ndarray, avg_words: float | None = None, idf: bool = False):
+        self.vocabulary = vocabulary
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.doc_len = doc_len
+        self.idf = idf
+
+        if avg_words is None:
+            avg_words = float(np.mean(doc_len)) if len(doc_len) else 0.0
+
+        self.avg_words = avg_words
+
+        # parte do denominador que depende apenas do documento
+        self._norm = K * (1 - B + B * doc_len / avg_words) if avg_words else np.full(
+            len(doc_len), K * (1 - B))
+
+    @property
+    def num_docs(self) -> int:
+        return len(self.doc_len)
+
+    @staticmethod
+    def from_tokens(documents: list[list[str]], **kwargs) -> 'BM25':
+        vocabulary: dict[str, int] = dict()
+        rows, cols, data = [], [], []
+
+        for row, words in enumerate(documents):
+            for term, tf in Counter(words).items():
+                rows.append(row)
+                cols.append(vocabulary.setdefault(term, len(vocabulary)))
+                data.append(tf)
+
+        doc_len = np.array([len(words) for words in documents], dtype=np.float64)
+
+        return BM25._from_coordinates(vocabulary, np.array(rows, dtype=np.int32),
+                                      np.array(cols, dtype=np.int64), np.array(data, dtype=np.int32), doc_len, **kwargs)
+
+    @staticmethod
+    def from_corpus(corpus: list[str], **kwargs) -> 'BM25':
+        return BM25.from_tokens([prepare(doc) for doc in corpus], **kwargs)
+
+    @staticmethod
+    def from_postings(postings: dict[str, dict[str, int]], doc_len: dict[str, int], **kwargs) -> tuple['BM25', list[str]]:
+        #
+        #   Constrói o BM25 a partir das listas de um índice invertido
+        #   Retorna também os nomes dos documentos na ordem das linhas
+        #
+        names = list(doc_len)
+        position = {name: i for i, name in enumerate(names)}
+
+        vocabulary: dict[str, int] = dict()
+        rows, cols, data = [], [], []
+
+        for term, documents in postings.items():
+            col = vocabulary.setdefault(term, len(vocabulary))
+
+            for name, tf in documents.items():
+                rows.append(position[name])
+                cols.append(col)
+                data.append(tf)
+
+        lengths = np.array([doc_len[name] for name in names], dtype=np.float64)
+
+        scorer = BM25._from_coordinates(vocabulary, np.array(rows, dtype=np.int32),
+                                        np.array(cols, dtype=np.int64), np.array(data, dtype=np.int32), lengths, **kwargs)
+
+        return scorer, names
+
+    @staticmethod
+    def _from_coordinates(vocabulary: dict[str, int], rows: np.ndarray, cols: np.ndarray,
+                          data: np.ndarray, doc_len: np.ndarray, **kwargs) -> 'BM25':
+        order = np.argsort(cols, kind='stable')
+
+        indptr = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cols, minlength=len(vocabulary)), out=indptr[1:])
+
+        return BM25(vocabulary, indptr, rows[order], data[order], doc_len, **kwargs)
+
+    def document_frequency(self, col: int) -> int:
+        return int(self.indptr[col + 1] - self.indptr[col])
+
+    def term_weight(self, col: int) -> float:
+        if not self.idf:
+            return 1.0
+
+        return idf_weight(self.num_docs, self.document_frequency(col))
+
+    def term_contribution(self, term: str, weight: float | None = None) -> tuple[np.ndarray, np.ndarray] | None:
+        #
+        #   Documentos que contém o termo e a pontuação do termo em cada um
+        #   Um weight informado substitui o peso (IDF) calculado localmente
+        #
+        col = self.vocabulary.get(term)
+
+        if col is None:
+            return None
+
+        start, end = self.indptr[col], self.indptr[col + 1]
+        rows = self.indices[start:end]
+        tf = self.data[start:end]
+
+        if weight is None:
+            weight = self.term_weight(col)
+
+        return rows, weight * tf * (K + 1) / (tf + self._norm[rows])
+
+    def score_terms(self, terms: list[str],
+                    contributions: dict[str, tuple[np.ndarray, np.ndarray] | None] | None = None,
+                    weights: dict[str, float] | None = None) -> np.ndarray:
+        #
+        #   Pontua todos os documentos de uma vez para os termos já preparados
+        #   Termos repetidos na query contam uma vez para cada repetição,
+        #   como no bm25_no_idf. Um dicionário contributions compartilhado
+        #   entre várias buscas guarda a pontuação de cada termo, de forma que
+        #   termos em comum sejam consultados uma única vez. weights permite
+        #   usar pesos calculados fora deste BM25 (ex: IDF de vários índices)
+        #
+        docs, values = [], []
+
+        for term, count in Counter(terms).items():
+            weight = weights.get(term) if weights is not None else None
+
+            if contributions is None:
+                contribution = self.term_contribution(term, weight)
+            elif term in contributions:
+                contribution = contributions[term]
+            else:
+                contribution = self.term_contribution(term, weight)
+                contributions[term] = contribution
+
+            if contribution is None:
+                continue
+
+            rows, points = contribution
+
+            docs.append(rows)
+            values.append(points * count if count > 1 else points)
+
+        if not docs:
+            return np.zeros(self.num_docs)
+
+        return np.bincount(np.concatenate(docs), weights=np.concatenate(values),
+                           minlength=self.num_docs)
+
+    def score(self, query: str) -> np.ndarray:
+        return self.score_terms(prepare(query))
@@ -0,0 +1,192 @@
+import hashlib
+import os
+import zlib
+from functools import lru_cache
+
+# Diretório e tamanho máximo (em bytes) padrão do cache de extração
+CACHE_DIR = os.environ.get(
+    'NLP_UEM_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'nlp-uem'))
+CACHE_MAX_SIZE = int(os.environ.get('NLP_UEM_CACHE_SIZE', 2 * 1024 ** 3))
+
+# A cada quantas escritas o tamanho do cache é verificado
+EVICT_EVERY = 32
+
+
+@lru_cache(maxsize=4096)
+def _hash_file(path: str, size: int, mtime_ns: int) -> str:
+    digest = hashlib.sha256()
+
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+def file_signature(path: str) -> tuple[int, int, str]:
+    #
+    #   Tamanho, data de modificação e SHA-256 do conteúdo do arquivo, com
+    #   o hash memorizado enquanto o tamanho e a data não mudarem
+    #
+    stat = os.stat(path)
+
+    return stat.st_size, stat.st_mtime_ns, _hash_file(os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+
+def file_hash(path: str) -> str:
+    return file_signature(path)[2]
+
+
+class CacheEntryWriter:
+    #
+    #   Escreve uma entrada comprimida aos poucos em um arquivo temporário
+    #   que só substitui a entrada final no commit (escrita atômica)
+    #
+    def __init__(self, cache: 'ExtractionCache', key: str):
+        self.cache = cache
+        self.path = cache.entry_path(key)
+        self.tmp_path = '%s.%d.tmp' % (self.path, os.getpid())
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        self.file = open(self.tmp_path, 'wb')
+        self.compressor = zlib.compressobj()
+
+    def write(self, text: str):
+        self.file.write(self.compressor.compress(text.encode('utf-8')))
+
+    def commit(self):
+        self.file.write(self.compressor.flush())
+        self.file.close()
+
+        os.replace(self.tmp_path, self.path)
+
+        self.cache.written()
+
+    def discard(self):
+        try:
+            self.file.close()
+        except OSError:
+            pass
+
+        try:
+            os.remove(self.tmp_path)
+        except OSError:
+            pass
+
+
+class ExtractionCache:
+    #
+    #   Cache do texto extraído dos PDFs endereçado pelo conteúdo
+    #   A chave é o hash do PDF mais a versão do extrator, então um PDF
+    #   modificado (ou um extrator novo) nunca reaproveita texto antigo,
+    #   e o mesmo cache serve para cópias do acervo em outros diretórios
+    #   ou máquinas. As entradas são comprimidas e, ao passar do tamanho
+    #   máximo, as menos usadas recentemente são removidas
+    #
+    directory: str
+    max_size: int
+    hits: int
+    misses: int
+
+    def __init__(self, directory: str = CACHE_DIR, max_size: int = CACHE_MAX_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+
+    def key(self, path: str, version: str, digest: str | None = None) -> str:
+        # digest permite usar um hash já calculado do PDF
+        return '%s-%s' % (digest or file_hash(path), version)
+
+    def entry_path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + '.z')
+
+    def get(self, key: str) -> str | None:
+        path = self.entry_path(key)
+
+        try:
+            with open(path, 'rb') as file:
+                text = zlib.decompress(file.read()).decode('utf-8')
+        except (OSError, zlib.error):
+            self.misses += 1
+
+            return None
+
+        self.hits += 1
+
+        # marca a entrada como usada recentemente
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        return text
+
+    def writer(self, key: str) -> CacheEntryWriter:
+        return CacheEntryWriter(self, key)
+
+    def put(self, key: str, text: str):
+        entry = self.writer(key)
+        entry.write(text)
+        entry.commit()
+
+    def written(self):
+        self._writes += 1
+
+        if self._writes % EVICT_EVERY == 1:
+            self.evict()
+
+    def evict(self):
+        entries = []
+        total = 0
+
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith('.z'):
+                    continue
+
+                path = os.path.join(root, name)
+
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+
+                entries.append((stat.st_mtime_ns, stat.st_size, path))
+                total += stat.st_size
+
+        entries.sort()
+
+        for _, size, path in entries:
+            if total <= self.max_size:
+                break
+
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+
+            total -= size
+
+
+_default_cache: ExtractionCache | None = None
+
+
+def get_cache() -> ExtractionCache:
+    global _default_cache
+
+    if _default_cache is None:
+        _default_cache = ExtractionCache()
+
+    return _default_cache
+
+
+def configure_cache(directory: str | None = None, max_size: int | None = None) -> ExtractionCache:
+    global _default_cache
+
+    _default_cache = ExtractionCache(
+        directory or CACHE_DIR, max_size if max_size is not None else CACHE_MAX_SIZE)
+
+    return _default_cache
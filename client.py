@@ -0,0 +1,75 @@
+import json
+import os
+import urllib.error
+import urllib.parse
+import urllib.request
+
+# Endereço padrão do servidor de busca
+SERVER_HOST = os.environ.get('NLP_UEM_SERVER_HOST', '127.0.0.1')
+SERVER_PORT = int(os.environ.get('NLP_UEM_SERVER_PORT', 8765))
+
+
+#
+#   Cliente do servidor de busca (server.py)
+#   Não importa o NLTK nem o NumPy, então scripts que só fazem buscas
+#   não pagam o custo de carregá-los
+#
+class SearchClient:
+    def __init__(self, host: str = SERVER_HOST, port: int = SERVER_PORT, timeout: float = 5.0):
+        self.base_url = 'http://%s:%d' % (host, port)
+        self.timeout = timeout
+
+    def request(self, path: str, **params) -> dict:
+        url = self.base_url + path
+
+        if params:
+            url += '?' + urllib.parse.urlencode(params)
+
+        with urllib.request.urlopen(url, timeout=self.timeout) as response:
+            return json.load(response)
+
+    def available(self) -> bool:
+        try:
+            return self.request('/health').get('status') == 'ok'
+        except (OSError, ValueError):
+            return False
+
+    def search(self, directory_path: str, query: str, k: int = 10) -> list[tuple[str, float]] | None:
+        #
+        #   None se o diretório não for servido por este servidor
+        #
+        try:
+            results = self.request('/search', dir=os.path.abspath(directory_path), q=query, k=k)
+        except urllib.error.HTTPError as error:
+            if error.code == 404:
+                return None
+
+            raise
+
+        return [(name, points) for name, points in results['results']]
+
+    def papers(self, directory_path: str) -> list[str]:
+        return self.request('/papers', dir=os.path.abspath(directory_path))['papers']
+
+    def paper(self, directory_path: str, paper_id: str) -> dict | None:
+        try:
+            return self.request('/paper', dir=os.path.abspath(directory_path), id=paper_id)
+        except urllib.error.HTTPError as error:
+            if error.code == 404:
+                return None
+
+            raise
+
+
+def connect(host: str = SERVER_HOST, port: int = SERVER_PORT) -> SearchClient | None:
+    #
+    #   Cliente para o servidor, ou None se não houver um servidor rodando
+    #
+    client = SearchClient(host, port, timeout=0.5)
+
+    if not client.available():
+        return None
+
+    client.timeout = 5.0
+
+    return client
@@ -0,0 +1,272 @@
+import re
+
+from nltk.chunk.regexp import ChunkRule, tag_pattern2re_pattern
+
+OBJECTIVE = 'objective'
+PROBLEM = 'problem'
+METHOD = 'method'
+CONTRIBUITIONS = 'contribuitions'
+
+#
+#   Gramáticas usadas por cada extrator, como pares (padrão de
+#   etiquetas, descrição) de ChunkRule
+#
+RULES: dict[str, list[tuple[str, str]]] = {
+    OBJECTIVE: [
+        # this paper proposes a new security
+        # this paper proposes a method
+        # this paper proposes improved standards
+        ('<DT><NN><VBZ><DT>?<JJ>?<N.*>',
+         'Delimitador, substantivo, verbo, substantivo'),
+
+        # paper we present
+        # in this paper we present
+        ('(<IN><DT>)?<NN><PRP><VB>.*',
+         'substantivo, pronome verbo'),
+
+        # we propose a method
+        # we propose three methods
+        # we propose three new methods
+        # we propose a new method
+        ('<PRP><VBP><DT|CD>?<JJ>?<NN>',
+         'Pronome, verbo-participio, delimitador, adjetivo, substantivo'),
+
+        # something is proposed
+        # TurboJPEG is proposed
+        ('<NN|NNP><VBZ><VBN>',
+         'Substantivo/Nome próprio, verbo-presente, verbo-presente-participio'),
+    ],
+    PROBLEM: [
+        # the well-known problem of
+        ('<DT|CD><JJ><NN|NNS><IN>',
+         'Delimitador|Cardinal, Adjetivo, Substantivo, Preposição'),
+        # lacks better security
+        ('<NNS><JJ><N.*>',
+         'Substantivo plural, Adjetivo, Substantivo/Nome próprio'),
+        # such as
+        ('<JJ><IN>',
+         'Adjetivo, Preposição'),
+        # security has always been
+        ('<NNS><VBZ><RB>?<VBN>',
+         'Substantivo plural, verbo-presente, advérbio?, verbo-presente-participio'),
+        # this can prevent
+        ('<DT><MD><VB>',
+         'Delimitador, verbo-modal, verbo'),
+        # by solving the
+        ('<IN><VBG><DT>',
+         'Preposição, verbo-gerundio, delimitador'),
+    ],
+    METHOD: [
+        # problem is extended to the
+        ('<NN><VBZ><VBN><TO><DT>',
+         'Substantivo, verbo-presente, verbo-presente-participio, preposição, delimitador'),
+        # comparative analysis of several ALP
+        ('<JJ><NN><IN><JJ><NN|NNP|NNS>',
+         'Adjetivo, substantivo, preposição, adjetivo, substantivo'),
+        # using the measurement methodology
+        ('<VBG><DT><NN>',
+         'Verbo-gerundio, delimitador, substantivo'),
+        # we investigate the performance
+        ('<PRP><VBP><DT><JJ>',
+         'Pronome, verbo-presente, delimitador, adjetivo'),
+        # evaluated and compared to
+        ('<VBN><CC><VBN><TO>',
+         'Verbo-presente-participio, conjunção-coordenativa, verbo-presente-participio, preposição'),
+        # experiments are conducted in this paper
+        ('<NNS><VBP><VBN><IN><DT><NN>',
+         'Substantivo plural, verbo-presente, verbo-presente-participio'),
+    ],
+    CONTRIBUITIONS: [
+        # the main contribution of this paper
+        ('<DT><JJ><NN><IN><DT><NN>',
+         'Delimitador, adjetivo, substantivo, preposição, delimitador, substantivo'),
+        # Based on the results of
+        ('<VBN><IN><DT><NNS><IN>',
+         'Verbo-presente-participio, preposição, delimitador, substantivo plural, preposição'),
+        # 'gives similar security with
+        ('<VBZ><JJ><NN><IN>',
+         'Verbo-presente, adjetivo, substantivo, preposição'),
+    ],
+}
+
+# As mesmas gramáticas como ChunkRule, compiladas uma única vez na importação
+GRAMMARS: dict[str, list[ChunkRule]] = {
+    category: [ChunkRule(pattern, descr) for pattern, descr in rules]
+    for category, rules in RULES.items()
+}
+
+#
+#   Expressões que indicam (ou descartam) uma frase antes da gramática
+#
+
+# se conter palavras como "in this paper" ou "we propose" é um forte indicativo de objetivo
+in_paper_re = re.compile(
+    r'\b(?:in this paper|we propose|this paper presents?|this paper proposes?|is proposed in this paper)\b', re.IGNORECASE)
+
+method_comparative_re = re.compile(
+    r'\b(?:comparative analysis?|by utilizing|this paper|evaluation of|analysis of?|is? extended|relies on|experimentation)\b', re.IGNORECASE)
+
+method_negative_re = re.compile(
+    r'contribution|section|the associate editor|discussion', re.IGNORECASE)
+
+contrib_comparative_re = re.compile(
+    r'contribution|contribute|we proposed|based on the results|demonstrate|similar|in this paper|this paper', re.IGNORECASE)
+
+contrib_negative_re = re.compile(
+    r'section|objective', re.IGNORECASE)
+
+
+#
+#   Cada ChunkRule é aplicada pelo RegexpChunkParser como uma expressão
+#   regular sobre a sequência de etiquetas "<DT><NN>...". Uma frase gera
+#   um chunk se, e somente se, alguma regra da gramática encontra essa
+#   expressão, então basta testar essas expressões sobre a sequência de
+#   etiquetas, montada uma única vez por frase. As expressões são geradas
+#   a partir dos padrões pela função pública tag_pattern2re_pattern, sem
+#   depender dos atributos internos da ChunkRule
+#
+_MATCHERS: dict[str, list[re.Pattern]] = {
+    category: [re.compile(tag_pattern2re_pattern(pattern)) for pattern, _ in rules]
+    for category, rules in RULES.items()
+}
+
+
+def tag_string(tags: tuple[str, ...]) -> str:
+    return '<' + '><'.join(tags) + '>'
+
+
+def match_grammars(tags: tuple[str, ...], categories: list[str] | None = None) -> set[str]:
+    #
+    #   Testa uma frase já etiquetada contra as gramáticas das categorias
+    #   pedidas (ou de todas) e retorna as categorias que casaram
+    #
+    if categories is None:
+        categories = list(_MATCHERS)
+
+    tagged = tag_string(tags)
+
+    return {category for category in categories
+            if any(regexp.search(tagged) for regexp in _MATCHERS[category])}
+
+
+#
+#   Pré-filtro por pistas lexicais
+#   Cada ChunkRule exige certas etiquetas (<DT>, <PRP>, <MD>...). Várias
+#   delas são de classes fechadas, atribuídas pelo etiquetador quase só a
+#   um pequeno conjunto de palavras, então uma frase sem nenhuma dessas
+#   palavras não tem como casar com a regra e não precisa ser etiquetada
+#   No modo 'safe' apenas as classes fechadas são usadas. O modo 'fast'
+#   também usa sufixos típicos das classes abertas (-ing, -ed, -s), o que
+#   descarta mais frases ao custo de perder algumas que o etiquetador
+#   classificaria de forma diferente
+#
+PREFILTER_MODES = ('off', 'safe', 'fast')
+
+CLOSED_CLASS: dict[str, frozenset[str]] = {
+    'DT': frozenset([
+        'a', 'an', 'the', 'this', 'that', 'these', 'those', 'some', 'any', 'no', 'each',
+        'every', 'all', 'both', 'either', 'neither', 'another', 'such', 'half', 'whatever',
+        'which', 'what', 'whichever', 'del', 'la', 'le', 'el', 'les']),
+    'PRP': frozenset([
+        'i', 'we', 'you', 'he', 'she', 'it', 'they', 'me', 'us', 'him', 'her', 'them',
+        'itself', 'themselves', 'ourselves', 'myself', 'yourself', 'yourselves', 'himself',
+        'herself', 'oneself', 'one', 'em', 'ours', 'theirs', 'mine', 'yours', 'hers']),
+    'MD': frozenset([
+        'can', 'could', 'may', 'might', 'must', 'shall', 'should', 'will', 'would', 'ca',
+        'wo', 'sha', 'need', 'ought', 'cannot', 'dare', 'll']),
+    'TO': frozenset(['to']),
+    'CC': frozenset([
+        'and', 'or', 'but', 'nor', 'yet', 'plus', 'either', 'neither', 'both', 'versus',
+        'vs', 'n', 'minus', 'times', 'whether', 'so']),
+    'IN': frozenset([
+        'of', 'in', 'on', 'at', 'by', 'for', 'with', 'from', 'about', 'as', 'into', 'like',
+        'through', 'after', 'over', 'between', 'out', 'against', 'during', 'without',
+        'before', 'under', 'around', 'among', 'amongst', 'than', 'that', 'if', 'whether',
+        'because', 'since', 'while', 'whilst', 'although', 'though', 'unless', 'until',
+        'till', 'upon', 'via', 'within', 'across', 'along', 'behind', 'beyond', 'despite',
+        'except', 'per', 'toward', 'towards', 'throughout', 'whereas', 'so', 'once',
+        'above', 'below', 'beside', 'besides', 'near', 'off', 'onto', 'outside', 'inside',
+        'unlike', 'up', 'down', 'past', 'amid', 'beneath', 'underneath', 'versus', 'vs',
+        'albeit', 'lest', 'worth', 'next', 'de', 'en', 'thru', 'ago', 'wherever', 'whenever',
+        'where', 'when', 'alongside', 'atop', 'notwithstanding', 'save', 'opposite',
+        'regarding', 'concerning', 'considering', 'including', 'following', 'given']),
+}
+
+OPEN_CLASS_SUFFIXES: dict[str, tuple[str, ...]] = {
+    'VBG': ('ing',),
+    'VBN': ('ed', 'en', 'wn', 'ne', 'de', 'lt', 'ght', 'nd', 'un', 'ut', 'et', 'pt', 'ld'),
+    'VBZ': ('s',),
+    'NNS': ('s',),
+}
+
+_word_re = re.compile(r'[a-z]+')
+
+
+def required_tags(pattern: str) -> list[tuple[str, ...]]:
+    #
+    #   Etiquetas obrigatórias de um padrão de ChunkRule, uma tupla de
+    #   alternativas por posição. Posições opcionais (<X>?, <X>* e grupos
+    #   "(...)?") não são exigidas
+    #
+    pattern = re.sub(r'\([^()]*\)[?*]', '', pattern)
+
+    return [tuple(tags.split('|')) for tags, quantifier in re.findall(r'<([^>]+)>([?*+]?)', pattern)
+            if quantifier not in ('?', '*')]
+
+
+class CuePrefilter:
+    mode: str
+    rules: dict[str, list[list[frozenset[str]]]]
+
+    def __init__(self, mode: str = 'safe'):
+        self.mode = mode
+
+        cues = set(CLOSED_CLASS)
+
+        if mode == 'fast':
+            cues |= set(OPEN_CLASS_SUFFIXES)
+
+        #
+        #   Para cada regra, as posições que podem ser verificadas por pistas:
+        #   todas as alternativas da posição precisam ter uma pista
+        #
+        self.rules = {
+            category: [[frozenset(alternatives) for alternatives in required_tags(pattern)
+                        if cues.issuperset(alternatives)] for pattern, _ in rules]
+            for category, rules in RULES.items()
+        }
+
+    def cues(self, sentence: str) -> set[str]:
+        words = set(_word_re.findall(sentence.lower()))
+
+        found = {tag for tag, vocabulary in CLOSED_CLASS.items()
+                 if not vocabulary.isdisjoint(words)}
+
+        if self.mode == 'fast':
+            found.update(tag for tag, suffixes in OPEN_CLASS_SUFFIXES.items()
+                         if any(word.endswith(suffixes) for word in words))
+
+        return found
+
+    def plausible(self, sentence: str, categories: list[str]) -> list[str]:
+        #
+        #   Categorias cuja gramática ainda pode casar com a frase
+        #
+        cues = self.cues(sentence)
+
+        return [category for category in categories
+                if any(all(not required.isdisjoint(cues) for required in rule)
+                       for rule in self.rules[category])]
+
+
+_prefilters: dict[str, CuePrefilter] = dict()
+
+
+def get_prefilter(mode: str) -> CuePrefilter | None:
+    if mode == 'off':
+        return None
+
+    if mode not in _prefilters:
+        _prefilters[mode] = CuePrefilter(mode)
+
+    return _prefilters[mode]
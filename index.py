@@ -0,0 +1,474 @@
+import json
+import os
+import sys
+from collections import Counter
+
+import numpy as np
+
+import leitor
+from bm25 import BM25, SortedVocabulary, prepare
+from text import (NORMALIZATION_CACHE_FILENAME, load_normalization_cache,
+                  save_normalization_cache)
+
+MAPPED_INDEX_FILENAME = '.index.bin'
+
+#
+#   Formato do índice mapeado em memória:
+#   MAGIC | tamanho do cabeçalho (8 bytes) | cabeçalho JSON | vetores
+#   O cabeçalho descreve o tipo, a forma e a posição de cada vetor, e os
+#   vetores começam alinhados em ARRAY_ALIGNMENT bytes, de forma que
+#   possam ser lidos diretamente do arquivo mapeado, sem cópia
+#
+MAPPED_INDEX_MAGIC = b'NLPUEMIX'
+MAPPED_INDEX_FORMAT = 1
+ARRAY_ALIGNMENT = 64
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ARRAY_ALIGNMENT) * ARRAY_ALIGNMENT
+
+
+def write_arrays(path: str, arrays: dict[str, np.ndarray], meta: dict):
+    specs, offset = dict(), 0
+
+    for name, array in arrays.items():
+        specs[name] = {'dtype': array.dtype.str,
+                       'shape': list(array.shape), 'offset': offset}
+        offset = _aligned(offset + array.nbytes)
+
+    header = json.dumps({'format': MAPPED_INDEX_FORMAT, 'meta': meta,
+                         'arrays': specs}).encode('utf-8')
+    start = _aligned(len(MAPPED_INDEX_MAGIC) + 8 + len(header))
+
+    tmp_path = '%s.%d.tmp' % (path, os.getpid())
+
+    with open(tmp_path, 'wb') as file:
+        file.write(MAPPED_INDEX_MAGIC)
+        file.write(len(header).to_bytes(8, 'little'))
+        file.write(header)
+
+        for name, array in arrays.items():
+            file.seek(start + specs[name]['offset'])
+            file.write(np.ascontiguousarray(array).tobytes())
+
+        file.truncate(start + offset)
+
+    os.replace(tmp_path, path)
+
+
+def read_arrays(path: str) -> tuple[dict[str, np.ndarray], dict] | None:
+    #
+    #   Mapeia o arquivo uma única vez e devolve vetores que apontam para
+    #   o mapeamento, além dos metadados. Retorna None se o arquivo não
+    #   existir, estiver em outro formato ou for inválido (truncado, com o
+    #   cabeçalho corrompido ou com um vetor que não cabe no arquivo)
+    #
+    try:
+        with open(path, 'rb') as file:
+            if file.read(len(MAPPED_INDEX_MAGIC)) != MAPPED_INDEX_MAGIC:
+                return None
+
+            size = int.from_bytes(file.read(8), 'little')
+            header = json.loads(file.read(size))
+
+        buffer = np.memmap(path, dtype=np.uint8, mode='r')
+    except (OSError, ValueError):
+        return None
+
+    if not isinstance(header, dict) or header.get('format') != MAPPED_INDEX_FORMAT:
+        return None
+
+    start = _aligned(len(MAPPED_INDEX_MAGIC) + 8 + size)
+    arrays = dict()
+
+    try:
+        meta = header['meta']
+
+        for name, spec in header['arrays'].items():
+            dtype = np.dtype(spec['dtype'])
+            shape = tuple(int(n) for n in spec['shape'])
+            begin = start + int(spec['offset'])
+            end = begin + int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+
+            if min(shape, default=0) < 0 or begin < start or end > len(buffer):
+                return None
+
+            arrays[name] = buffer[begin:end].view(dtype).reshape(shape)
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None
+
+    if not isinstance(meta, dict):
+        return None
+
+    return arrays, meta
+
+
+INDEX_ARRAYS = ('terms', 'indptr', 'indices', 'data',
+                'doc_len', 'names', 'sizes', 'mtimes')
+
+
+def _consistent(arrays: dict[str, np.ndarray]) -> bool:
+    #
+    #   Confere se os vetores lidos formam um índice: todos presentes, uma
+    #   lista por termo e um tamanho e uma assinatura por documento. Não
+    #   percorre as listas, de forma que abrir o índice continue sem
+    #   depender do número de termos
+    #
+    if any(name not in arrays or arrays[name].ndim != 1 for name in INDEX_ARRAYS):
+        return False
+
+    indptr = arrays['indptr']
+
+    if len(indptr) != len(arrays['terms']) + 1 or indptr[0] != 0:
+        return False
+
+    if not indptr[-1] == len(arrays['indices']) == len(arrays['data']):
+        return False
+
+    num_docs = len(arrays['names'])
+
+    return all(len(arrays[name]) == num_docs for name in ('doc_len', 'sizes', 'mtimes'))
+
+
+def _fixed_width(strings: list[str]) -> np.ndarray:
+    encoded = [string.encode('utf-8') for string in strings]
+
+    return np.array(encoded, dtype='S%d' % max([1] + [len(e) for e in encoded]))
+
+
+#
+#   Índice invertido persistido no diretório dos artigos
+#   Guarda, para cada termo já preparado (tokenizado, sem stop words,
+#   lematizado e com stem), as frequências em cada documento, além do
+#   tamanho de cada documento, de forma que uma busca só precise ler
+#   as listas dos termos da query
+#   Em disco fica no formato mapeado em memória (MAPPED_INDEX_FILENAME).
+#   Ao abrir, as listas continuam no arquivo mapeado e a busca roda sobre
+#   elas; os dicionários de listas só são montados quando um documento é
+#   adicionado ou removido. Depois disso (uma vez por processo, percorrendo
+#   todas as listas) os dicionários continuam sendo a versão do índice que
+#   é alterada, e cada save() monta os vetores a partir deles
+#   PDFs que não puderam ser lidos ficam fora do índice, com a assinatura
+#   guardada em failed (e nos metadados do arquivo), e só são tentados de
+#   novo quando forem modificados
+#
+class InvertedIndex:
+    directory_path: str
+    doc_len: dict[str, int]
+    signatures: dict[str, tuple[int, int]]
+    failed: dict[str, tuple[int, int]]
+    total_len: int
+    version: int
+
+    def __init__(self, directory_path: str):
+        self.directory_path = directory_path
+        self.doc_len = dict()
+        self.signatures = dict()
+        self.failed = dict()
+        self.total_len = 0
+        self.version = 0
+        self._postings = dict()
+        self._doc_terms = dict()
+        self._mapped = None
+        self._arrays = None
+        self._scorer = None
+        self._saved = False
+
+    @property
+    def postings(self) -> dict[str, dict[str, int]]:
+        if self._postings is None:
+            self._materialize()
+
+        return self._postings
+
+    @property
+    def doc_terms(self) -> dict[str, list[str]]:
+        if self._doc_terms is None:
+            self._materialize()
+
+        return self._doc_terms
+
+    def _materialize(self):
+        #
+        #   Monta os dicionários de listas a partir dos vetores mapeados,
+        #   que deixam de ser usados (o índice vai ser alterado)
+        #
+        arrays = self._mapped
+        names = list(self.doc_len)
+
+        self._postings = dict()
+        self._doc_terms = {name: [] for name in names}
+
+        indptr = arrays['indptr']
+
+        for col, term in enumerate(arrays['terms']):
+            term = term.decode('utf-8')
+            start, end = int(indptr[col]), int(indptr[col + 1])
+
+            documents = self._postings[term] = dict()
+
+            for row, tf in zip(arrays['indices'][start:end].tolist(), arrays['data'][start:end].tolist()):
+                documents[names[row]] = tf
+                self._doc_terms[names[row]].append(term)
+
+        self._mapped = None
+        self._scorer = None
+
+    @property
+    def avg_len(self) -> float:
+        if not self.doc_len:
+            return 0.0
+
+        return self.total_len / len(self.doc_len)
+
+    def add_document(self, name: str, text: str):
+        if name in self.doc_len:
+            self.remove_document(name)
+
+        words = prepare(text)
+        frequencies = Counter(words)
+        postings = self.postings
+
+        for term, tf in frequencies.items():
+            postings.setdefault(term, dict())[name] = tf
+
+        self.doc_len[name] = len(words)
+        self.doc_terms[name] = list(frequencies)
+        self.total_len += len(words)
+        self.version += 1
+        self._arrays = None
+        self._scorer = None
+        self._saved = False
+
+    def remove_document(self, name: str):
+        postings = self.postings
+
+        for term in self.doc_terms.pop(name, []):
+            documents = postings[term]
+            del documents[name]
+
+            if not documents:
+                del postings[term]
+
+        self.total_len -= self.doc_len.pop(name, 0)
+        self.signatures.pop(name, None)
+        self.failed.pop(name, None)
+        self.version += 1
+        self._arrays = None
+        self._scorer = None
+        self._saved = False
+
+    def update_document(self, name: str, signature: tuple[int, int, str] | None = None):
+        #
+        #   (Re)indexa um único PDF do diretório
+        #   signature é o (tamanho, data de modificação, hash) do conteúdo
+        #   já processado pelo pipeline, cujo texto é lido do cache de
+        #   extração pelo hash, de forma que o índice use a mesma versão
+        #   do PDF que o XML
+        #
+        archive_path = os.path.join(self.directory_path, name)
+
+        if signature is None:
+            stat = os.stat(archive_path)
+            size, mtime, digest = stat.st_size, stat.st_mtime_ns, None
+        else:
+            size, mtime, digest = signature
+
+        self.add_document(name, leitor.extrair_texto(archive_path, digest=digest))
+        self.signatures[name] = (size, mtime)
+        self.failed.pop(name, None)
+
+    def update(self) -> bool:
+        #
+        #   Sincroniza o índice com os PDFs do diretório
+        #   PDFs novos ou modificados são (re)indexados e PDFs removidos
+        #   saem do índice. Um PDF que não pode ser lido (corrompido ou
+        #   ainda sendo copiado) é informado e fica fora do índice até ser
+        #   modificado, sem impedir os demais. Retorna se houve alguma
+        #   alteração
+        #
+        changed = False
+        found = set()
+
+        for archive in os.listdir(self.directory_path):
+            if not archive.endswith('.pdf'):
+                continue
+
+            archive_path = os.path.join(self.directory_path, archive)
+
+            # removido depois do listdir, sai do índice como os demais
+            try:
+                stat = os.stat(archive_path)
+            except FileNotFoundError:
+                continue
+
+            found.add(archive)
+            signature = (stat.st_size, stat.st_mtime_ns)
+
+            if signature in (self.signatures.get(archive), self.failed.get(archive)):
+                continue
+
+            try:
+                self.update_document(archive)
+            except FileNotFoundError:
+                found.discard(archive)
+                continue
+            except Exception as error:
+                # stderr: a saída das buscas (main.py search) é JSON lines
+                print('Erro ao indexar', archive_path, error, file=sys.stderr)
+
+                if archive in self.doc_len:
+                    self.remove_document(archive)
+
+                self.failed[archive] = signature
+                self._saved = False
+
+            changed = True
+
+        for archive in set(self.doc_len) - found:
+            self.remove_document(archive)
+            changed = True
+
+        for archive in set(self.failed) - found:
+            del self.failed[archive]
+            self._saved = False
+            changed = True
+
+        return changed
+
+    def scorer(self, idf: bool = False) -> tuple[BM25, list[str]]:
+        #
+        #   BM25 vetorizado construído a partir das listas do índice
+        #   Fica guardado até a próxima alteração do índice
+        #
+        if self._scorer is not None and self._scorer[0].idf == idf:
+            return self._scorer
+
+        arrays = self._mapped if self._mapped is not None else self._arrays
+
+        if arrays is not None:
+            # direto sobre os vetores mapeados ou gravados, sem montar as listas
+            self._scorer = BM25(SortedVocabulary(arrays['terms']), arrays['indptr'], arrays['indices'],
+                                arrays['data'], arrays['doc_len'], idf=idf), list(self.doc_len)
+        else:
+            self._scorer = BM25.from_postings(
+                self.postings, self.doc_len, idf=idf)
+
+        return self._scorer
+
+    def score(self, query: str, idf: bool = False) -> dict[str, float]:
+        #
+        #   BM25 percorrendo apenas as listas dos termos da query
+        #   Documentos que não contém nenhum termo ficam com pontuação 0
+        #
+        scorer, names = self.scorer(idf)
+        points = scorer.score(query)
+
+        return {names[i]: float(points[i]) for i in np.flatnonzero(points)}
+
+    def to_arrays(self) -> dict[str, np.ndarray]:
+        names = list(self.doc_len)
+        position = {name: i for i, name in enumerate(names)}
+
+        postings = self.postings
+        terms = sorted(postings)
+
+        indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum([len(postings[term]) for term in terms], out=indptr[1:])
+
+        indices = np.fromiter((position[name] for term in terms for name in postings[term]),
+                              dtype=np.int32, count=int(indptr[-1]))
+        data = np.fromiter((tf for term in terms for tf in postings[term].values()),
+                           dtype=np.int32, count=int(indptr[-1]))
+
+        signatures = [self.signatures.get(name, (-1, -1)) for name in names]
+
+        return {
+            'terms': _fixed_width(terms),
+            'indptr': indptr,
+            'indices': indices,
+            'data': data,
+            'doc_len': np.array([self.doc_len[name] for name in names], dtype=np.float64),
+            'names': _fixed_width(names),
+            'sizes': np.array([size for size, _ in signatures], dtype=np.int64),
+            'mtimes': np.array([mtime for _, mtime in signatures], dtype=np.int64),
+        }
+
+    def save(self):
+        if self._saved:
+            # nada mudou desde que o arquivo foi aberto ou gravado
+            return
+
+        path = os.path.join(self.directory_path, MAPPED_INDEX_FILENAME)
+
+        # se apenas os PDFs com falha mudaram, os vetores são os mesmos
+        arrays = self._mapped if self._mapped is not None else self._arrays
+
+        if arrays is None:
+            arrays = self.to_arrays()
+
+            #
+            #   Os vetores gravados ficam guardados junto com os dicionários:
+            #   até a próxima alteração as buscas rodam sobre eles, sem
+            #   reconstruir o BM25 a partir das listas, e a próxima alteração
+            #   não precisa montar os dicionários de novo a partir do arquivo
+            #
+            self._arrays = arrays
+            self._scorer = None
+
+        write_arrays(path, arrays, {'version': self.version, 'failed': self.failed})
+        self._saved = True
+
+    @staticmethod
+    def from_arrays(directory_path: str, arrays: dict[str, np.ndarray], meta: dict) -> 'InvertedIndex':
+        index = InvertedIndex(directory_path)
+
+        names = [name.decode('utf-8') for name in arrays['names']]
+
+        index.doc_len = dict(zip(names, arrays['doc_len'].astype(np.int64).tolist()))
+        index.signatures = {name: (size, mtime) for name, size, mtime in zip(
+            names, arrays['sizes'].tolist(), arrays['mtimes'].tolist()) if size >= 0}
+        index.total_len = sum(index.doc_len.values())
+        index.version = meta.get('version', 0)
+        index.failed = {name: tuple(signature) for name, signature in meta.get('failed', dict()).items()}
+
+        index._postings = None
+        index._doc_terms = None
+        index._mapped = arrays
+        index._saved = True
+
+        return index
+
+    @staticmethod
+    def load(directory_path: str) -> 'InvertedIndex':
+        #
+        #   Sem o arquivo mapeado (ou com um arquivo inválido) o índice começa
+        #   vazio e o update() o reconstrói a partir dos PDFs. Um .index do
+        #   formato antigo (pickle) não é lido, o diretório pode ser
+        #   compartilhado e carregar um pickle executaria código arbitrário
+        #
+        mapped = read_arrays(os.path.join(
+            directory_path, MAPPED_INDEX_FILENAME))
+
+        if mapped is not None and _consistent(mapped[0]):
+            return InvertedIndex.from_arrays(directory_path, *mapped)
+
+        return InvertedIndex(directory_path)
+
+
+def open_index(directory_path: str) -> InvertedIndex:
+    #
+    #   Abre o índice do diretório, atualizando-o caso algum PDF
+    #   tenha sido adicionado, modificado ou removido
+    #
+    cache_path = os.path.join(directory_path, NORMALIZATION_CACHE_FILENAME)
+
+    load_normalization_cache(cache_path)
+
+    index = InvertedIndex.load(directory_path)
+
+    if index.update():
+        index.save()
+        save_normalization_cache(cache_path)
+
+    return index
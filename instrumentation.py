@@ -0,0 +1,93 @@
+import json
+import time
+from contextlib import contextmanager, nullcontext
+
+
+#
+#   Registro de tempos e contadores das etapas de um artigo
+#   É opcional: as funções stage e count abaixo não fazem nada quando
+#   não há um Profile, então o custo sem instrumentação é desprezível
+#
+class Profile:
+    stages: dict[str, float]
+    counters: dict[str, int]
+
+    def __init__(self):
+        self.stages = dict()
+        self.counters = dict()
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(
+                name, 0.0) + time.perf_counter() - start
+
+    def count(self, name: str, value: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def to_dict(self) -> dict:
+        return {'stages': self.stages, 'counters': self.counters}
+
+
+def stage(profile: Profile | None, name: str):
+    return profile.stage(name) if profile is not None else nullcontext()
+
+
+def count(profile: Profile | None, name: str, value: int = 1):
+    if profile is not None:
+        profile.count(name, value)
+
+
+#
+#   Agrega os registros dos artigos (vindos de todos os workers) e os
+#   grava em JSON lines, um artigo por linha
+#
+class ProfileSummary:
+    papers: int
+    stages: dict[str, float]
+    counters: dict[str, int]
+
+    def __init__(self, path: str):
+        self.file = open(path, 'a')
+        self.papers = 0
+        self.stages = dict()
+        self.counters = dict()
+
+    def add(self, filename: str, record: dict):
+        self.file.write(json.dumps({'file': filename, **record}) + '\n')
+        self.file.flush()
+
+        self.papers += 1
+
+        for name, seconds in record['stages'].items():
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+        for name, value in record['counters'].items():
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def close(self):
+        self.file.close()
+
+    def show(self):
+        print("\n=============== Perfil ===============\n")
+        print("Artigos: ", self.papers)
+
+        if not self.papers:
+            return
+
+        total = sum(self.stages.values()) or 1.0
+
+        print("\n%-28s %10s %10s %7s" % ('Etapa', 'Total(s)', 'Média(s)', '%'))
+
+        for name, seconds in sorted(self.stages.items(), key=lambda x: x[1], reverse=True):
+            print("%-28s %10.3f %10.3f %6.1f%%" % (
+                name, seconds, seconds / self.papers, 100 * seconds / total))
+
+        print("\n%-28s %10s %10s" % ('Contador', 'Total', 'Média'))
+
+        for name, value in sorted(self.counters.items()):
+            print("%-28s %10d %10.1f" % (name, value, value / self.papers))
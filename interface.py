@@ -1,20 +1,173 @@
 import os
+import queue
+import threading
 import tkinter
+from collections import OrderedDict
 import tkinter.messagebox
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import filedialog
 
 import customtkinter
 from CTkTable import *
 
-import leitor
 import main
 import searchByTerm
+from client import connect
+from store import open_store
 
 # Modes: "System" (standard), "Dark", "Light"
 customtkinter.set_appearance_mode("System")
 # Themes: "blue" (standard), "green", "dark-blue"
 customtkinter.set_default_color_theme("blue")
 
+# Quantidade de resultados da busca desenhados por vez
+RESULTS_PAGE_SIZE = 20
+
+# Linhas da lista de artigos que existem de fato como widgets
+VISIBLE_ROWS = 15
+# Caracteres do nome do artigo mostrados em cada linha da lista
+ROW_TITLE_LENGTH = 26
+# Artigos cujas informações ficam em memória
+METADATA_CACHE_SIZE = 256
+
+
+def format_title(title: str) -> str:
+    new_title = ''
+
+    # Inserir '\n' a cada 30 caracteres
+    for i in range(0, len(title), 25):
+        new_title += title[i:i+25] + '\n'
+
+    return new_title
+
+
+def short_title(title: str) -> str:
+    if len(title) <= ROW_TITLE_LENGTH:
+        return title
+
+    return title[:ROW_TITLE_LENGTH - 1] + '…'
+
+
+class ArticleList(customtkinter.CTkFrame):
+    #
+    #   Lista virtualizada de artigos: apenas VISIBLE_ROWS botões são
+    #   criados e, ao rolar ou filtrar, somente o texto deles muda, então
+    #   abrir um diretório com milhares de artigos custa o mesmo que abrir
+    #   um com poucos
+    #
+    def __init__(self, master, command, **kwargs):
+        super().__init__(master, **kwargs)
+
+        self.command = command
+        self.articles: list[str] = []
+        self.members: set[str] = set()
+        self.visible: list[str] = self.articles
+        self.first = 0
+        self.selected = None
+
+        self.grid_columnconfigure(0, weight=1)
+
+        self.label = customtkinter.CTkLabel(self, text="Diretório selecionado")
+        self.label.grid(row=0, column=0, columnspan=2, padx=5, pady=(5, 0))
+
+        self.filter_entry = customtkinter.CTkEntry(
+            self, placeholder_text="Filtrar por título")
+        self.filter_entry.grid(row=1, column=0, columnspan=2,
+                               padx=5, pady=5, sticky="ew")
+        self.filter_entry.bind('<KeyRelease>', self.on_filter)
+
+        self.rows = []
+
+        for i in range(VISIBLE_ROWS):
+            button = customtkinter.CTkButton(self, text='', anchor='w', height=24, fg_color='transparent', text_color=(
+                "gray10", "#DCE4EE"), hover_color='#1F6AA5', command=lambda i=i: self.on_click(i))
+            button.grid(row=2 + i, column=0, padx=(5, 0), pady=1, sticky="ew")
+
+            for sequence in ('<MouseWheel>', '<Button-4>', '<Button-5>'):
+                button.bind(sequence, self.on_mousewheel)
+
+            self.rows.append(button)
+
+        self.scrollbar = customtkinter.CTkScrollbar(self, command=self.on_scroll)
+        self.scrollbar.grid(row=2, column=1, rowspan=VISIBLE_ROWS,
+                            padx=(0, 5), sticky="ns")
+
+    def matches(self, article: str) -> bool:
+        text = self.filter_entry.get().lower()
+
+        return not text or text in article.lower()
+
+    def set_articles(self, articles: list[str]):
+        self.articles = list(articles)
+        self.members = set(self.articles)
+        self.apply_filter()
+
+    def add(self, article: str):
+        if article in self.members:
+            return
+
+        self.articles.append(article)
+        self.members.add(article)
+
+        if self.visible is not self.articles and self.matches(article):
+            self.visible.append(article)
+
+        self.render()
+
+    def select(self, article: str):
+        self.selected = article
+        self.render()
+
+    def apply_filter(self):
+        if self.filter_entry.get():
+            self.visible = [
+                article for article in self.articles if self.matches(article)]
+        else:
+            self.visible = self.articles
+
+        self.scroll_to(0)
+
+    def on_filter(self, event=None):
+        self.apply_filter()
+
+    def on_click(self, row: int):
+        index = self.first + row
+
+        if index < len(self.visible):
+            self.command(self.visible[index])
+
+    def on_scroll(self, action, value, unit=None):
+        if action == 'moveto':
+            self.scroll_to(int(float(value) * len(self.visible)))
+        else:
+            step = VISIBLE_ROWS if unit == 'pages' else 1
+            self.scroll_to(self.first + int(value) * step)
+
+    def on_mousewheel(self, event):
+        # Linux envia Button-4/5, Windows e macOS o delta da roda
+        self.scroll_to(self.first + (3 if event.num == 5 or event.delta < 0 else -3))
+
+    def scroll_to(self, first: int):
+        self.first = max(0, min(first, len(self.visible) - VISIBLE_ROWS))
+        self.render()
+
+    def render(self):
+        for i, button in enumerate(self.rows):
+            index = self.first + i
+
+            if index < len(self.visible):
+                article = self.visible[index]
+                button.configure(text=short_title(article), state='normal',
+                                 fg_color='#1F6AA5' if article == self.selected else 'transparent')
+            else:
+                button.configure(text='', state='disabled',
+                                 fg_color='transparent')
+
+        total = max(len(self.visible), 1)
+
+        self.scrollbar.set(self.first / total,
+                           min(1.0, (self.first + VISIBLE_ROWS) / total))
+
 
 class MainWindow(customtkinter.CTk):
     def __init__(self):
@@ -43,40 +196,26 @@ class MainWindow(customtkinter.CTk):
             self.sidebar_frame, text="Analisador\nde texto\ncientifico", font=customtkinter.CTkFont(size=24, weight="bold"))
         self.logo_label.grid(row=0, column=0, padx=20, pady=(20, 10))
 
-        self.controller_search = None
+        # Processamento dos artigos em segundo plano
+        self.processing_executor = ThreadPoolExecutor(max_workers=1)
+        self.processing_events = None
+        self.processing_cancel = None
+        self.processing_failed: list[str] = []
+
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
 
     def brutal_init(self):
 
-        self.frame_diretorio = customtkinter.CTkScrollableFrame(
-            self.sidebar_frame, label_text="Diretório selecionado")
+        self.frame_diretorio = ArticleList(
+            self.sidebar_frame, command=self.show_article)
         self.frame_diretorio.grid(
             row=1, column=0,  padx=15, pady=15, sticky="nsew")
 
         self.button_change_directory.configure(command=self.change_directory)
 
-        if not self.articles_path:
-            for arquivo in os.listdir(self.articles_directory_path):
-                if arquivo.endswith(".xml"):
-                    self.articles_path.append(os.path.join(
-                        self.articles_directory_path, arquivo))
-
-        self.articles_titles_formatted = []
-        self.articles_titles_formatted.append(("Artigos",))
-
-        for title, in self.articles_titles:
-            new_title = ''
-
-            # Inserir '\n' a cada 30 caracteres
-            for i in range(0, len(title), 25):
-                new_title += title[i:i+25] + '\n'
-
-            # Armazenar o novo título na nova lista de títulos
-            self.articles_titles_formatted.append((new_title,))
-
-        self.table_articles = CTkTable(self.frame_diretorio, width=190, values=self.articles_titles_formatted,
-                                       header_color="#144870", hover_color='#1F6AA5', command=self.select_article)
-        self.table_articles.grid(row=0, column=0, padx=5, pady=5)
-        self.table_articles.select_row(0)
+        # Apenas os artigos já processados, os demais entram ao terminar
+        self.frame_diretorio.set_articles(
+            [title for title, in self.articles_titles if title in self.articles_processed])
 
         self.appearance_mode_label = customtkinter.CTkLabel(
             self.sidebar_frame, text="Modo de aparencia:", anchor="w")
@@ -92,8 +231,13 @@ class MainWindow(customtkinter.CTk):
         self.frame_termos.grid(row=0, column=2, padx=15,
                                pady=15, sticky="nsew")
 
-        self.article_title, self.article_objective, self.article_problem, self.article_method, self.article_contribuitions, self.most_quoted_terms = leitor.xml_reader(
-            self.articles_path[0])
+        if self.frame_diretorio.articles:
+            self.frame_diretorio.select(self.frame_diretorio.articles[0])
+            self.article_title, self.article_objective, self.article_problem, self.article_method, self.article_contribuitions, self.most_quoted_terms = self.article_metadata(
+                self.frame_diretorio.articles[0])
+        else:
+            self.article_title = self.article_objective = self.article_problem = self.article_method = self.article_contribuitions = 'Processando...'
+            self.most_quoted_terms = [('Quant', 'Termo')]
 
         self.table_terms = CTkTable(
             self.frame_termos, width=40, values=self.most_quoted_terms, header_color="#144870", hover_color="#144870")
@@ -126,99 +270,266 @@ class MainWindow(customtkinter.CTk):
         customtkinter.set_appearance_mode(new_appearance_mode)
 
     def init_directory(self):
-        self.articles_directory_path = filedialog.askdirectory()
+        articles_directory_path = filedialog.askdirectory()
+
+        if not articles_directory_path:
+            return
+
+        self.cancel_processing()
+
+        if hasattr(self, 'frame_diretorio'):
+            self.frame_diretorio.destroy()
+
+        self.articles_directory_path = articles_directory_path
+
+        # Acervo com as informações extraídas, aberto uma única vez
+        self.store = open_store(self.articles_directory_path)
+
+        # Servidor de busca (server.py), se houver um rodando
+        self.search_client = connect()
+
+        # Informações dos artigos já consultados, por nome do PDF
+        self.metadata_cache = OrderedDict()
 
         # Lista para armazenar os títulos dos artigos
         self.articles_titles = []
-        self.articles_path = []
+        self.articles_processed = set(self.store.ids())
 
         # Iterar sobre os arquivos na pasta
-        for arquivo in os.listdir(self.articles_directory_path):
+        arquivos = os.listdir(self.articles_directory_path)
+        existentes = set(arquivos)
+
+        for arquivo in arquivos:
             if arquivo.endswith(".pdf"):
                 self.articles_titles.append((arquivo,))
-            if arquivo.endswith(".xml"):
-                self.articles_path.append(os.path.join(
-                    self.articles_directory_path, arquivo))
 
-        if not self.articles_path:
-            estado_retorno = main.main(self.articles_directory_path)
+                # XML de uma execução anterior ao acervo
+                if arquivo not in self.articles_processed and arquivo + ".xml" in existentes:
+                    self.store.import_xml(os.path.join(
+                        self.articles_directory_path, arquivo + ".xml"))
+                    self.articles_processed.add(arquivo)
+
         self.brutal_init()
 
+        # Processa apenas os artigos novos ou alterados, em segundo plano
+        self.start_processing()
+
+    def start_processing(self):
+        self.processing_events = queue.Queue()
+        self.processing_cancel = threading.Event()
+        self.processing_failed = []
+
+        self.progress_label = customtkinter.CTkLabel(
+            self.sidebar_frame, text="Processando artigos...", anchor="w")
+        self.progress_label.grid(row=2, column=0, padx=20, pady=(10, 0))
+        self.progress_bar = customtkinter.CTkProgressBar(self.sidebar_frame)
+        self.progress_bar.grid(row=3, column=0, padx=20, pady=(5, 0))
+        self.progress_bar.set(0)
+        self.button_cancel = customtkinter.CTkButton(
+            self.sidebar_frame, text="Cancelar", fg_color="transparent", border_width=2, command=self.cancel_processing)
+        self.button_cancel.grid(row=4, column=0, padx=20, pady=(5, 10), sticky="n")
+
+        self.processing_executor.submit(
+            self.process_in_background, self.articles_directory_path, self.processing_events, self.processing_cancel)
+
+        self.after(100, self.poll_processing)
+
+    def process_in_background(self, directory_path: str, events: queue.Queue, cancel: threading.Event):
+        #
+        #   Executa fora da thread da interface, enviando um evento a cada
+        #   artigo concluído (ou que falhou). A interface nunca é acessada daqui
+        #
+        try:
+            args = main.default_args(incremental=True)
+
+            for fullpath, paper, finished, total in main.process_directory(directory_path, args, cancel):
+                events.put(('paper' if paper is not None else 'failed', fullpath, finished, total))
+
+            events.put(('finished', None, 0, 0))
+        except Exception as error:
+            events.put(('error', str(error), 0, 0))
+
+    def poll_processing(self):
+        events = self.processing_events
+
+        if events is None:
+            return
+
+        while True:
+            try:
+                kind, value, finished, total = events.get_nowait()
+            except queue.Empty:
+                break
+
+            if kind in ('paper', 'failed'):
+                if kind == 'paper':
+                    self.add_processed_article(value)
+                else:
+                    self.processing_failed.append(os.path.basename(value))
+
+                self.progress_bar.set(finished / total)
+                self.progress_label.configure(
+                    text=f"Processados {finished} de {total}")
+                continue
+
+            if kind == 'error':
+                tkinter.messagebox.showerror(
+                    "Erro", f"Erro ao processar os artigos:\n{value}")
+            elif self.processing_failed:
+                failed = '\n'.join(self.processing_failed[:10])
+
+                if len(self.processing_failed) > 10:
+                    failed += f"\n... e mais {len(self.processing_failed) - 10}"
+
+                tkinter.messagebox.showwarning(
+                    "Aviso", f"Não foi possível processar os artigos:\n{failed}")
+
+            self.finish_processing()
+
+            return
+
+        self.after(100, self.poll_processing)
+
+    def add_processed_article(self, fullpath: str):
+        article = os.path.basename(fullpath)
+
+        self.articles_processed.add(article)
+
+        # um artigo reprocessado pode ter mudado
+        self.metadata_cache.pop(article, None)
+
+        self.frame_diretorio.add(article)
+
+    def article_metadata(self, article: str):
+        metadata = self.metadata_cache.get(article)
+
+        if metadata is not None:
+            self.metadata_cache.move_to_end(article)
+
+            return metadata
+
+        metadata = self.store.read(article)
+
+        self.metadata_cache[article] = metadata
+
+        if len(self.metadata_cache) > METADATA_CACHE_SIZE:
+            self.metadata_cache.popitem(last=False)
+
+        return metadata
+
+    def cancel_processing(self):
+        if self.processing_cancel is not None:
+            self.processing_cancel.set()
+
+        if self.processing_events is not None:
+            self.finish_processing()
+
+    def finish_processing(self):
+        self.processing_events = None
+
+        for widget in ('progress_label', 'progress_bar', 'button_cancel'):
+            if hasattr(self, widget):
+                getattr(self, widget).destroy()
+
+    def on_close(self):
+        self.cancel_processing()
+        self.processing_executor.shutdown(wait=False)
+        self.destroy()
+
     def change_directory(self):
-        self.frame_diretorio.destroy()
         self.init_directory()
 
     def select_article(self, informacoes_da_celula_selecionada):
+        # Clique em um resultado da busca
+        artigo = self.search_articles.get(
+            informacoes_da_celula_selecionada['value'])
 
-        if self.controller_search != None:
-            for indice, tupla in enumerate(self.articles_titles_formatted):
-                if tupla[0] == informacoes_da_celula_selecionada['value']:
-                    indice_celula_selecionada = indice
-        else:
-            indice_celula_selecionada = informacoes_da_celula_selecionada['row']
-
-        # Desseliciona uma linha caso exista uma selecionada anteriormente
-        indice_linha_selecionada_anteriormente = self.table_articles.get_selected_row()[
-            'row_index']
-        if (indice_linha_selecionada_anteriormente != None):
-            self.table_articles.deselect_row(
-                indice_linha_selecionada_anteriormente)
-
-        if indice_celula_selecionada != 0:
-            # Seleciona visualmente a linha inteira da célula selecionada
-            self.table_articles.select_row(indice_celula_selecionada)
-
-            for caminho in self.articles_path:
-                caminho_modificado = os.path.basename(caminho)
-                if caminho_modificado[:20] == informacoes_da_celula_selecionada['value'][:20]:
-                    novo_caminho = caminho
-
-            # Ajustando a interface de acordo com o artigo selecionado
-            self.textbox.delete("0.0", customtkinter.END)
-            self.article_title, self.article_objective, self.article_problem, self.article_method, self.article_contribuitions, self.most_quoted_terms = leitor.xml_reader(
-                novo_caminho)
-            self.textbox.insert("0.0", "Informações extraídas\n\n" + "Titulo:\n" + self.article_title + "\n\nObjetivo:\n" + self.article_objective +
-                                "\n\nProblema:\n" + self.article_problem + "\n\nMetodo:\n" + self.article_method + "\n\nContribuições:\n" + self.article_contribuitions)
-            self.table_terms.configure(values=self.most_quoted_terms)
+        # artigos ainda em processamento (e o cabeçalho) não estão na lista
+        if artigo is None or artigo not in self.articles_processed:
+            return
+
+        self.show_article(artigo)
+
+    def show_article(self, artigo: str):
+        # Seleciona visualmente a linha do artigo
+        self.frame_diretorio.select(artigo)
+
+        # Ajustando a interface de acordo com o artigo selecionado
+        self.textbox.delete("0.0", customtkinter.END)
+        self.article_title, self.article_objective, self.article_problem, self.article_method, self.article_contribuitions, self.most_quoted_terms = self.article_metadata(
+            artigo)
+        self.textbox.insert("0.0", "Informações extraídas\n\n" + "Titulo:\n" + self.article_title + "\n\nObjetivo:\n" + self.article_objective +
+                            "\n\nProblema:\n" + self.article_problem + "\n\nMetodo:\n" + self.article_method + "\n\nContribuições:\n" + self.article_contribuitions)
+        self.table_terms.configure(values=self.most_quoted_terms)
 
     def search_by_term(self):
         self.term_entered = self.entry.get()
 
+        # Nova busca, os resultados anteriores são descartados
+        self.results_shown = RESULTS_PAGE_SIZE
+
         if self.number_of_searches == 0:
             self.frame_search = customtkinter.CTkScrollableFrame(
                 self, width=280, label_text=f"Resultado da busca do termo <{self.term_entered}>")
             self.frame_search.grid(
                 row=0, column=3, padx=15, pady=15, sticky="nsew")
+        else:
+            self.frame_search.configure(
+                label_text=f"Resultado da busca do termo <{self.term_entered}>")
 
-            self.points_results_of_search = searchByTerm.search_by_term(
-                self.term_entered, self.articles_directory_path)
-            self.results_of_search = []
+        self.number_of_searches += 1
 
-            for i in range(len(self.points_results_of_search)):
-                self.results_of_search.append(
-                    (self.articles_titles_formatted[i+1][0], round(float(self.points_results_of_search[i]), 3)))
+        self.show_search_results()
 
-            self.results_of_search_sorted = [('Artigo', 'Pontuacao')] + sorted(
-                self.results_of_search, key=lambda x: x[1], reverse=True)
+    def show_search_results(self):
+        #
+        #   Desenha apenas os primeiros resultados. Buscas repetidas vêm do
+        #   cache do searchByTerm, então mostrar mais resultados é imediato
+        #
+        results = self.search_top_k(self.results_shown + 1)
 
-            self.table_search = CTkTable(self.frame_search, width=80, values=self.results_of_search_sorted,
-                                         header_color="#144870", hover_color="#144870", command=self.select_article)
-            self.table_search.grid(row=0, column=0, padx=5, pady=5)
-        else:
-            self.frame_search.configure(
-                label_text=f"Resultado da busca do termo <{self.term_entered}>")
-            self.points_results_of_search = searchByTerm.search_by_term(
-                self.term_entered, self.articles_directory_path)
+        # Título formatado -> artigo, para os cliques na tabela
+        self.search_articles = {format_title(name): name for name, _ in results}
+
+        self.results_of_search_sorted = [('Artigo', 'Pontuacao')] + [
+            (format_title(name), round(points, 3)) for name, points in results[:self.results_shown]]
+
+        if hasattr(self, 'table_search'):
+            self.table_search.destroy()
+
+        self.table_search = CTkTable(self.frame_search, width=80, values=self.results_of_search_sorted,
+                                     header_color="#144870", hover_color="#144870", command=self.select_article)
+        self.table_search.grid(row=0, column=0, padx=5, pady=5)
+
+        if hasattr(self, 'button_more_results'):
+            self.button_more_results.destroy()
+            del self.button_more_results
+
+        if len(results) > self.results_shown:
+            self.button_more_results = customtkinter.CTkButton(
+                self.frame_search, text="Mais resultados", command=self.show_more_results)
+            self.button_more_results.grid(row=1, column=0, padx=5, pady=5)
+
+    def search_top_k(self, k: int) -> list[tuple[str, float]]:
+        #
+        #   Usa o servidor de busca quando disponível, que já tem o índice em
+        #   memória, e a busca local caso contrário (se ele parar ou não
+        #   servir o diretório aberto)
+        #
+        if self.search_client is not None:
+            try:
+                results = self.search_client.search(self.articles_directory_path, self.term_entered, k)
 
-            for i in range(len(self.points_results_of_search)):
-                self.results_of_search.append(
-                    (self.articles_titles_formatted[i+1][0], round(float(self.points_results_of_search[i]), 3)))
+                if results is not None:
+                    return results
+            except (OSError, ValueError):
+                self.search_client = None
 
-            self.results_of_search_sorted = [('Artigo', 'Pontuacao')] + sorted(
-                self.results_of_search, key=lambda x: x[1], reverse=True)
-            self.table_search.configure(values=self.results_of_search_sorted)
+        return searchByTerm.search_top_k(self.term_entered, self.articles_directory_path, k)
 
-        self.controller_search = 2
+    def show_more_results(self):
+        self.results_shown += RESULTS_PAGE_SIZE
+        self.show_search_results()
 
 
 if __name__ == "__main__":
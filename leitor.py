@@ -1,28 +1,120 @@
 import os
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
 from xml.etree import ElementTree as ET
 
 import PyPDF2
 
+from cache import get_cache
 
-def extrair_texto(path: str) -> str:
-    if (os.path.isfile(path + '.cache')):
-        with open(path + '.cache', 'r') as cache:
-            return cache.read()
+# Versão do extrator, faz parte da chave do cache de extração
+EXTRACTOR_VERSION = '1-pypdf2-%s' % PyPDF2.__version__
 
+
+# Número mínimo de páginas por worker na extração paralela
+MIN_PAGES_PER_WORKER = 16
+
+
+def contar_paginas(path: str) -> int:
+    with open(path, 'rb') as file:
+        return len(PyPDF2.PdfReader(file).pages)
+
+
+def extrair_paginas(path: str, start: int = 0, end: int | None = None) -> Iterator[str]:
+    #
+    #   Extrai o texto das páginas [start, end) sob demanda, uma a uma
+    #
     with open(path, 'rb') as file:
         reader = PyPDF2.PdfReader(file)
-        num_pages = len(reader.pages)
 
-        text: str = ''
+        for page in reader.pages[start:end]:
+            yield page.extract_text()
+
+
+def _extrair_intervalo(path: str, start: int, end: int) -> list[str]:
+    return list(extrair_paginas(path, start, end))
+
+
+def extrair_paginas_paralelo(path: str, workers: int | None = None) -> Iterator[str]:
+    #
+    #   Divide as páginas de um PDF grande em intervalos extraídos em
+    #   paralelo, devolvendo as páginas em ordem assim que cada intervalo
+    #   termina, de forma que as primeiras páginas fiquem disponíveis
+    #   antes das últimas serem decodificadas
+    #
+    workers = workers or os.cpu_count() or 1
+    num_pages = contar_paginas(path)
+
+    workers = min(workers, num_pages // MIN_PAGES_PER_WORKER)
+
+    if workers <= 1:
+        yield from extrair_paginas(path)
+        return
+
+    step = -(-num_pages // workers)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_extrair_intervalo, path, start, min(start + step, num_pages))
+                   for start in range(0, num_pages, step)]
+
+        for future in futures:
+            yield from future.result()
+
+
+def ler_paginas(path: str, workers: int | None = None, digest: str | None = None) -> Iterator[str]:
+    #
+    #   Lê o texto do PDF página a página usando o cache de extração
+    #   quando existir. Caso contrário extrai (em paralelo se workers > 1)
+    #   gravando a entrada do cache à medida que as páginas chegam
+    #   digest é o hash do PDF, se já tiver sido calculado
+    #
+    cache = get_cache()
+    key = cache.key(path, EXTRACTOR_VERSION, digest)
+
+    text = cache.get(key)
+
+    if text is not None:
+        yield text
+        return
+
+    pages = extrair_paginas_paralelo(
+        path, workers) if workers and workers > 1 else extrair_paginas(path)
+
+    #
+    #   O cache pode estar em um diretório somente leitura, compartilhado ou
+    #   cheio. Se a entrada não puder ser criada, escrita ou confirmada, ela
+    #   é descartada e o PDF continua sendo lido sem cache
+    #
+    try:
+        entry = cache.writer(key)
+    except OSError:
+        entry = None
+
+    try:
+        for page in pages:
+            if entry is not None:
+                try:
+                    entry.write(page)
+                except OSError:
+                    entry.discard()
+                    entry = None
+
+            yield page
+    except BaseException:
+        # leitura interrompida, a entrada incompleta é descartada
+        if entry is not None:
+            entry.discard()
+        raise
 
-        for page_num in range(num_pages):
-            page = reader.pages[page_num]
-            text += page.extract_text()
+    if entry is not None:
+        try:
+            entry.commit()
+        except OSError:
+            entry.discard()
 
-    with open(path + '.cache', 'w') as cache:
-        cache.write(text)
 
-    return text
+def extrair_texto(path: str, workers: int | None = None, digest: str | None = None) -> str:
+    return ''.join(ler_paginas(path, workers, digest))
 
 
 def xml_reader(file_path):
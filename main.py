@@ -1,23 +1,55 @@
 import argparse
+import json
+import multiprocessing.util
 import os
-import re
 import sys
+import threading
+import time
 from collections import Counter, namedtuple
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from collections.abc import Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import ExitStack
 from xml.etree import ElementTree
 
 import nltk
 import numpy as np
-from nltk.chunk import RegexpChunkParser
-from nltk.chunk.regexp import ChunkRule
 
-from bm25 import bm25_no_idf
-from leitor import extrair_texto
-from text import (composite, illegal_xml_chars_RE, remove_delimiters,
-                  remove_numbers, remove_punctuation, remove_single_char,
-                  remove_stop_words, to_sentences, to_tokenized)
-
-IndexToSentence = namedtuple('IndexToSentence', ['index', 'text'])
+from bm25 import BM25, prepare
+from cache import file_signature, get_cache
+from grammar import (CONTRIBUITIONS, GRAMMARS, METHOD, OBJECTIVE, PROBLEM,
+                     PREFILTER_MODES, contrib_comparative_re,
+                     contrib_negative_re, get_prefilter, in_paper_re,
+                     match_grammars, method_comparative_re, method_negative_re)
+from index import InvertedIndex
+from instrumentation import Profile, ProfileSummary, count, stage
+from leitor import contar_paginas, ler_paginas
+from manifest import Manifest
+from searchByTerm import search_batch
+from sections import Sections, body, segment, split_references
+from store import open_store
+from text import (NORMALIZATION_CACHE_FILENAME, NORMALIZATION_SAVE_MISSES, composite,
+                  illegal_xml_chars_RE, lemma_cache, load_normalization_cache,
+                  preload_resources, puctuation, remove_delimiters,
+                  remove_delimiters_batched, remove_numbers,
+                  remove_punctuation, remove_single_char, remove_stop_words,
+                  save_normalization_cache, stem_cache, stop_words,
+                  to_sentences, to_tokenized)
+from watcher import DirectoryWatcher
+
+# Versão do pipeline de extração, registrada no manifesto junto de cada XML
+# Alterações que mudam os resultados devem incrementá-la
+PIPELINE_VERSION = '1'
+
+# Intervalo mínimo, em segundos, entre gravações do índice no modo --watch
+INDEX_SAVE_INTERVAL = 30.0
+
+# Modo padrão do pré-filtro das gramáticas (ver grammar.CuePrefilter)
+# As listas de palavras dos modos 'safe' e 'fast' não cobrem todas as que o
+# etiquetador pode marcar, então eles podem perder frases e são opcionais
+DEFAULT_PREFILTER = 'off'
+
+# Tokens (sem pontuação) e etiquetas POS de uma frase
+Annotation = namedtuple('Annotation', ['tokens', 'tags'])
 
 
 class ScyPaper:
@@ -29,179 +61,288 @@ class ScyPaper:
     method: str
     contribuitions: str
     references: list[str]
+    annotations: list[Annotation | None]
+    candidates: dict[str, set[int]] | None
+    prepared: dict[int, list[str]]
+    rankings: dict[str, list[tuple[int, float]]]
+    top_k: int
+    prefilter: str
+    profile: Profile | None
+
+    def __init__(self, text: str, profile: Profile | None = None, top_k: int = 1,
+                 prefilter: str = DEFAULT_PREFILTER):
+        self.profile = profile
+        self.top_k = top_k
+        self.prefilter = prefilter
+
+        with stage(profile, 'clean'):
+            # uma única passada encontra o corpo e as referências
+            sections = segment(text)
+
+            self.text = self.clear_text(text, sections)
+            self.references = self.find_references(text, sections)
+
+        with stage(profile, 'split_sentences'):
+            self.sentences = to_sentences(self.text)
+
+        self.annotations = [None] * len(self.sentences)
+        self.candidates = None
+        self.prepared = dict()
+        self.rankings = dict()
+
+        count(profile, 'sentences', len(self.sentences))
+        count(profile, 'references', len(self.references))
+
+    def release(self):
+        #
+        #   Descarta o estado intermediário (texto, frases, anotações e
+        #   candidatas) depois que os extratores rodaram, mantendo apenas
+        #   os campos extraídos, o bag of words e as referências
+        #
+        self.text = ''
+        self.sentences = []
+        self.annotations = []
+        self.candidates = None
+        self.prepared = dict()
+
+    @staticmethod
+    def from_pages(pages: Iterable[str], profile: Profile | None = None, **kwargs) -> 'ScyPaper':
+        #
+        #   Monta o artigo a partir das páginas à medida que são extraídas
+        #   As seções (resumo, corpo e referências) só são conhecidas com o
+        #   texto completo, então as páginas são acumuladas e unidas uma vez
+        #
+        with stage(profile, 'extract'):
+            text = ''.join(pages)
+
+        return ScyPaper(text, profile, **kwargs)
+
+    def annotate(self, indices: Iterable[int] | None = None) -> list[Annotation | None]:
+        #
+        #   Etiqueta (POS) de uma só vez todas as frases ainda não anotadas
+        #   As anotações são compartilhadas por todos os extratores, de
+        #   forma que cada frase seja etiquetada apenas uma vez
+        #
+        if indices is None:
+            indices = range(len(self.sentences))
+
+        pending = [i for i in indices if self.annotations[i] is None]
+
+        with stage(self.profile, 'tokenize'):
+            words = [composite(to_tokenized, remove_punctuation)(self.sentences[i])
+                     for i in pending]
+
+        with stage(self.profile, 'pos_tag'):
+            tagged_sentences = nltk.pos_tag_sents(words)
+
+        for i, tagged in zip(pending, tagged_sentences):
+            self.annotations[i] = Annotation(
+                tuple(token for token, _ in tagged), tuple(pos for _, pos in tagged))
+
+        count(self.profile, 'tagged_sentences', len(pending))
+        count(self.profile, 'tokens', sum(len(w) for w in words))
+
+        return self.annotations
 
-    def __init__(self, text: str):
-        self.text = self.clear_text(text)
-        self.references = self.find_references(text)
-        self.sentences = to_sentences(self.text)
+    def count_words(self, text: str, batched: bool = False) -> Counter:
+        #
+        #   Por padrão cada palavra é etiquetada isoladamente (com memorização),
+        #   mantendo o resultado de sempre. Com batched=True o texto é etiquetado
+        #   de uma vez, reaproveitando as anotações das frases quando já existem
+        #
+        if batched and text is self.text and None not in self.annotations:
+            words = [w for annotation in self.annotations
+                     for w, pos in zip(annotation.tokens, annotation.tags)
+                     if pos != 'DT' and w not in stop_words and w not in puctuation
+                     and not w.isdigit() and len(w) > 1]
+
+            self.bag_of_words = Counter(words)
+
+            return self.bag_of_words
 
-    def count_words(self, text: str) -> Counter:
         words = composite(
             to_tokenized,
             remove_stop_words,
             remove_punctuation,
             remove_numbers,
             remove_single_char,
-            remove_delimiters,
+            remove_delimiters_batched if batched else remove_delimiters,
         )(text)
 
         self.bag_of_words = Counter(words)
 
         return self.bag_of_words
 
-    def clear_text(self, text: str) -> str:
-        # remove todo texto até a primeira ocorrência de "abstract"
-        until_abstract = re.compile(
-            r'[\s\S]*?abstract', re.IGNORECASE | re.MULTILINE)
+    def clear_text(self, text: str, sections: Sections | None = None) -> str:
+        # corpo do texto: após a primeira ocorrência de "abstract" e até a
+        # primeira ocorrência de "references" seguinte
+        return body(text, sections)
 
-        r = re.sub(until_abstract, '', text.strip(), count=1)
+    def find_references(self, text: str, sections: Sections | None = None) -> list[str]:
+        # referências "[n] ..." após a primeira ocorrência de "references"
+        # (ou "bibliography")
+        return split_references(text, sections)
 
-        # remove todo texto após a última ocorrência de "references"
-        after_references = re.compile(
-            r'references[\s\S]*', re.IGNORECASE | re.MULTILINE)
+    def find_candidates(self) -> dict[str, set[int]]:
+        #
+        #   Percorre as frases uma única vez montando as frases candidatas
+        #   de todos os extratores. Frases indicadas (ou descartadas) pelas
+        #   palavras-chave de um extrator não passam pela sua gramática, as
+        #   que o pré-filtro mostra que não têm como casar também não, e
+        #   apenas as restantes são etiquetadas (em lote) e testadas contra
+        #   todas as gramáticas pendentes de uma só vez
+        #
+        if self.candidates is not None:
+            return self.candidates
 
-        r = re.sub(after_references, '', r.strip(), count=1)
+        prefilter = get_prefilter(self.prefilter)
 
-        return r
+        # índice -> (categorias já indicadas, categorias que dependem da gramática)
+        found: list[tuple[list[str], list[str]]] = []
+        skipped = 0
 
-    def find_references(self, text: str) -> list[str]:
-        # remove todo texto até a primeira ocorrência de "references"
-        until_references = re.compile(
-            r'[\s\S]*?(references|bibliography)', re.IGNORECASE | re.MULTILINE)
+        with stage(self.profile, 'prefilter'):
+            for sentence in self.sentences:
+                direct, pending = [], []
 
-        isolated = re.sub(until_references, '', text.strip(), count=1)
+                if (in_paper_re.findall(sentence)):
+                    direct.append(OBJECTIVE)
+                elif (sentence.strip() != ''):
+                    pending.append(OBJECTIVE)
 
-        # ([1]  X ...) [2]
-        reference_match = r'(\[[0-9]+\].*[\s\S]*?(?=\[[0-9]+\]|$))'
+                if (sentence.strip() != ''):
+                    pending.append(PROBLEM)
 
-        references = re.findall(reference_match, isolated)
+                if (method_comparative_re.search(sentence) and not method_negative_re.search(sentence)):
+                    direct.append(METHOD)
+                elif not method_negative_re.search(sentence) and sentence.strip() != '':
+                    pending.append(METHOD)
 
-        for i in range(len(references)):
-            references[i] = references[i].replace('\n', ' ').strip()
+                if (contrib_comparative_re.search(sentence) and not contrib_negative_re.search(sentence)):
+                    direct.append(CONTRIBUITIONS)
+                elif not contrib_negative_re.search(sentence) and sentence.strip() != '':
+                    pending.append(CONTRIBUITIONS)
 
-        return references
+                if pending and prefilter is not None:
+                    plausible = prefilter.plausible(sentence, pending)
 
-    def match_grammar(self, sentence: str, grammar: list[ChunkRule]) -> bool:
-        words = composite(
-            to_tokenized,
-            remove_punctuation,
-        )(sentence)
+                    for category in pending:
+                        if category not in plausible:
+                            count(self.profile, 'prefilter_skipped_' + category)
 
-        tagged = nltk.pos_tag(words)
+                    if not plausible:
+                        skipped += 1
 
-        tree = nltk.Tree('DOC', [(token, pos)
-                                 for token, pos in tagged])
+                    pending = plausible
 
-        chunk_parser = RegexpChunkParser(
-            grammar, chunk_label='MATCHED')
+                found.append((direct, pending))
 
-        chunks = chunk_parser.parse(tree)
+        count(self.profile, 'prefilter_skipped', skipped)
 
-        for chunk in chunks.subtrees():
-            if chunk.label() == 'MATCHED':
-                return True
+        self.annotate(index for index, (_, pending) in enumerate(found) if pending)
 
-        return False
+        with stage(self.profile, 'grammar'):
+            self.candidates = {category: set() for category in GRAMMARS}
 
-    def search_for_objective(self) -> str:
+            # na ordem das frases, como se cada uma fosse testada por vez
+            for index, (direct, pending) in enumerate(found):
+                matched = match_grammars(
+                    self.annotations[index].tags, pending) if pending else ()
+
+                for category in GRAMMARS:
+                    if category in direct or category in matched:
+                        self.candidates[category].add(index)
+
+        for category, candidates in self.candidates.items():
+            count(self.profile, 'candidates_' + category, len(candidates))
+
+        return self.candidates
+
+    def prepared_sentence(self, index: int) -> list[str]:
         #
-        #   Essa função busca por um objetivo no texto
-        #   baseado em estruturas gramaticais e palavras-chave
-        #   que indicam um objetivo
+        #   Frase já preparada para o BM25 (tokens, stopwords, lema, stem),
+        #   feita uma única vez mesmo sendo candidata de vários extratores
         #
+        words = self.prepared.get(index)
 
-        def ranquear_objetivo(list_of_sentences: list[str], sentence: IndexToSentence, avg_len: int) -> float:
-            #
-            #   Essa função ranqueia um objetivo baseado na sua posição no texto
-            #   e o escore de query BM25
-            #   De forma que objetivos no começo do texto, com palavras da query
-            #   pontuem mais
-            #
-            query = [
-                'objective',
-                'paper',
-                'problem',
-                'present',
-                'approach',
-                'proposes',
-                'proposed',
-                'explores'
-            ]
-
-            most_common = nltk.pos_tag(
-                [w for w, _ in self.bag_of_words.most_common(5)])
-
-            # Adiciona os substantivos mais comuns a query
-            for word, pos in most_common:
-                if (pos.startswith('N')):
-                    query.append(word)
-
-            points = bm25_no_idf(
-                list_of_sentences, sentence.text, ' '.join(query), avg_words=avg_len)
-
-            locality = (1.0 - (sentence.index /
-                        (len(list_of_sentences) + 1)))
-
-            return points + locality
-
-        in_paper_re = re.compile(
-            r'\b(?:in this paper|we propose|this paper presents?|this paper proposes?|is proposed in this paper)\b', re.IGNORECASE)
-
-        maybe_objective = set()
-
-        for (index, sentence) in enumerate(self.sentences):
-            # se conter palavras como "in this paper" ou "we propose" é um forte indicativo de objetivo
-            if (in_paper_re.findall(sentence)):
-                maybe_objective.add(index)
-                continue
+        if words is None:
+            words = prepare(self.sentences[index])
+            self.prepared[index] = words
 
-            # descarta frases vazias
-            if (sentence.strip() == ''):
-                continue
+        return words
+
+    def rank(self, category: str, query: list[str], locality: float = 0.0) -> list[tuple[int, float]]:
+        #
+        #   Pontua todas as frases candidatas da categoria de uma vez:
+        #   BM25 sem IDF da query mais locality * (1 - índice / (candidatas + 1)),
+        #   de forma que um peso positivo favoreça frases do começo do texto
+        #   e um negativo as do final. O tamanho médio usado é o número médio
+        #   de caracteres das candidatas, como sempre foi feito
+        #   Retorna as top_k melhores como (índice da frase, pontuação),
+        #   mantidas também em self.rankings para depuração
+        #
+        indices = np.fromiter(self.find_candidates()[category], dtype=np.int64)
+
+        if not indices.size:
+            self.rankings[category] = []
 
-            GRAMMAR = [
-                # this paper proposes a new security
-                # this paper proposes a method
-                # this paper proposes improved standards
-                ChunkRule(
-                    '<DT><NN><VBZ><DT>?<JJ>?<N.*>',
-                    'Delimitador, substantivo, verbo, substantivo'),
+            return []
 
-                # paper we present
-                # in this paper we present
-                ChunkRule('(<IN><DT>)?<NN><PRP><VB>.*',
-                          'substantivo, pronome verbo'),
+        with stage(self.profile, 'ranking'):
+            avg_len = np.mean([len(self.sentences[i]) for i in indices])
 
-                # we propose a method
-                # we propose three methods
-                # we propose three new methods
-                # we propose a new method
-                ChunkRule('<PRP><VBP><DT|CD>?<JJ>?<NN>',
-                          'Pronome, verbo-participio, delimitador, adjetivo, substantivo'),
+            points = BM25.from_tokens([self.prepared_sentence(i) for i in indices],
+                                      avg_words=avg_len).score_terms(prepare(' '.join(query)))
 
-                # something is proposed
-                # TurboJPEG is proposed
-                ChunkRule('<NN|NNP><VBZ><VBN>',
-                          'Substantivo/Nome próprio, verbo-presente, verbo-presente-participio'),
-            ]
+            if locality:
+                points += locality * (1.0 - indices / (len(indices) + 1))
 
-            if self.match_grammar(sentence, GRAMMAR):
-                maybe_objective.add(index)
+            # em caso de empate vence a primeira candidata, como no sort estável
+            if self.top_k == 1:
+                best = [int(np.argmax(points))]
+            else:
+                best = np.argsort(-points, kind='stable')[:self.top_k]
 
-        objective_with_index = [IndexToSentence(i, self.sentences[i])
-                                for i in maybe_objective]
+        self.rankings[category] = [(int(indices[i]), float(points[i])) for i in best]
 
-        objectives = [obj.text for obj in objective_with_index]
+        return self.rankings[category]
 
-        avg_len = np.mean([len(obj) for obj in objectives])
+    def best_sentence(self, category: str, query: list[str], locality: float, default: str) -> str:
+        ranking = self.rank(category, query, locality)
 
-        sorted_objetives = sorted(objective_with_index,
-                                  key=lambda x: ranquear_objetivo(objectives, x, avg_len), reverse=True)
+        match = self.sentences[ranking[0][0]] if ranking else default
 
-        match = sorted_objetives[0][1] if len(
-            sorted_objetives) > 0 else 'No objective found'
+        return match.replace('\n', ' ').strip()
+
+    def search_for_objective(self) -> str:
+        #
+        #   Essa função busca por um objetivo no texto
+        #   baseado em estruturas gramaticais e palavras-chave
+        #   que indicam um objetivo
+        #
 
-        self.objective = match.replace('\n', ' ').strip()
+        query = [
+            'objective',
+            'paper',
+            'problem',
+            'present',
+            'approach',
+            'proposes',
+            'proposed',
+            'explores'
+        ]
+
+        most_common = nltk.pos_tag(
+            [w for w, _ in self.bag_of_words.most_common(5)])
+
+        # Adiciona os substantivos mais comuns a query
+        for word, pos in most_common:
+            if (pos.startswith('N')):
+                query.append(word)
+
+        # Objetivos no começo do texto, com palavras da query, pontuam mais
+        self.objective = self.best_sentence(
+            OBJECTIVE, query, 1.0, 'No objective found')
 
         return self.objective
 
@@ -212,80 +353,18 @@ class ScyPaper:
         #   baseado em estruturas gramaticais e palavras-chave
         #
 
-        def ranquear_problema(list_of_sentences: list[str], sentence: IndexToSentence, avg_len: int) -> float:
-            #
-            #   Essa função ranqueia um problema baseado na sua posição no texto
-            #   e o escore de query BM25
-            #   De forma que problemas no começo do texto, com palavras da query
-            #   pontuem mais
-            #
-            query = [
-                'problem',
-                'issue',
-                'lacks',
-                'challenge',
-                'difficult',
-                'solve'
-            ]
-
-            points = bm25_no_idf(
-                list_of_sentences, sentence.text, ' '.join(query), avg_words=avg_len)
-
-            locality = (1.0 - (sentence.index /
-                        (len(list_of_sentences) + 1)))
-
-            return points + locality
-
-        maybe_problem = set()
-
-        for (index, sentence) in enumerate(self.sentences):
-            if (sentence.strip() == ''):
-                continue
+        query = [
+            'problem',
+            'issue',
+            'lacks',
+            'challenge',
+            'difficult',
+            'solve'
+        ]
 
-            GRAMMAR = [
-                # the well-known problem of
-                ChunkRule(
-                    '<DT|CD><JJ><NN|NNS><IN>',
-                    'Delimitador|Cardinal, Adjetivo, Substantivo, Preposição'),
-                # lacks better security
-                ChunkRule(
-                    '<NNS><JJ><N.*>',
-                    'Substantivo plural, Adjetivo, Substantivo/Nome próprio'),
-                # such as
-                ChunkRule(
-                    '<JJ><IN>',
-                    'Adjetivo, Preposição'),
-                # security has always been
-                ChunkRule(
-                    '<NNS><VBZ><RB>?<VBN>',
-                    'Substantivo plural, verbo-presente, advérbio?, verbo-presente-participio'),
-                # this can prevent
-                ChunkRule(
-                    '<DT><MD><VB>',
-                    'Delimitador, verbo-modal, verbo'),
-                # by solving the
-                ChunkRule(
-                    '<IN><VBG><DT>',
-                    'Preposição, verbo-gerundio, delimitador'),
-
-            ]
-            if self.match_grammar(sentence, GRAMMAR):
-                maybe_problem.add(index)
-
-        problems_with_index = [IndexToSentence(i, self.sentences[i])
-                               for i in maybe_problem]
-
-        problems = [obj.text for obj in problems_with_index]
-
-        avg_len = np.mean([len(obj) for obj in problems])
-
-        sorted_problems = sorted(problems_with_index,
-                                 key=lambda x: ranquear_problema(problems, x, avg_len), reverse=True)
-
-        match = sorted_problems[0][1] if len(
-            sorted_problems) > 0 else 'No problem found'
-
-        self.problem = match.replace('\n', ' ').strip()
+        # Problemas no começo do texto, com palavras da query, pontuam mais
+        self.problem = self.best_sentence(
+            PROBLEM, query, 1.0, 'No problem found')
 
         return self.problem
 
@@ -296,105 +375,32 @@ class ScyPaper:
         #   baseado em estruturas gramaticais e palavras-chave
         #
 
-        def ranquear_metodos(list_of_sentences: list[str], sentence: IndexToSentence, avg_len: int) -> float:
-            #
-            #   Essa função ranqueia metodologias baseado na sua posição no texto
-            #   e o escore de query BM25
-            #   De forma que metodologias no começo do texto, com palavras da query
-            #   pontuem mais
-            #
-            query = [
-                'analysis',
-                'methodology',
-                'content',
-                'survey',
-                'review',
-                'evaluation',
-                'comparative',
-                'extended',
-                'overview',
-                'state-of-the-art'
-                'discussed',
-                'evaluated',
-                'compared',
-                'paper',
-                'simulation',
-                'utilizing',
-                'investigate',
-                'experiment',
-                'relies'
-
-            ]
-
-            points = bm25_no_idf(
-                list_of_sentences, sentence.text, ' '.join(query), avg_words=avg_len)
-
-            return points
-
-        maybe_method = set()
-
-        comparative_re = re.compile(
-            r'\b(?:comparative analysis?|by utilizing|this paper|evaluation of|analysis of?|is? extended|relies on|experimentation)\b', re.IGNORECASE)
-
-        negative_re = re.compile(
-            r'contribution|section|the associate editor|discussion', re.IGNORECASE)
-
-        for (index, sentence) in enumerate(self.sentences):
-            if (comparative_re.search(sentence) and not negative_re.search(sentence)):
-                maybe_method.add(index)
-                continue
-
-            if (negative_re.search(sentence)):
-                continue
-
-            if (sentence.strip() == ''):
-                continue
-
-            GRAMMAR = [
-                # problem is extended to the
-                ChunkRule(
-                    '<NN><VBZ><VBN><TO><DT>',
-                    'Substantivo, verbo-presente, verbo-presente-participio, preposição, delimitador'),
-                # comparative analysis of several ALP
-                ChunkRule(
-                    '<JJ><NN><IN><JJ><NN|NNP|NNS>',
-                    'Adjetivo, substantivo, preposição, adjetivo, substantivo'),
-                # using the measurement methodology
-                ChunkRule(
-                    '<VBG><DT><NN>',
-                    'Verbo-gerundio, delimitador, substantivo'),
-                # we investigate the performance
-                ChunkRule(
-                    '<PRP><VBP><DT><JJ>',
-                    'Pronome, verbo-presente, delimitador, adjetivo'),
-                # evaluated and compared to
-                ChunkRule(
-                    '<VBN><CC><VBN><TO>',
-                    'Verbo-presente-participio, conjunção-coordenativa, verbo-presente-participio, preposição'),
-                # experiments are conducted in this paper
-                ChunkRule(
-                    '<NNS><VBP><VBN><IN><DT><NN>',
-                    'Substantivo plural, verbo-presente, verbo-presente-participio'),
-
-            ]
-
-            if self.match_grammar(sentence, GRAMMAR):
-                maybe_method.add(index)
-
-        method_with_index = [IndexToSentence(i, self.sentences[i])
-                             for i in maybe_method]
-
-        methods = [obj.text for obj in method_with_index]
-
-        avg_len = np.mean([len(obj) for obj in methods])
-
-        sorted_methods = sorted(method_with_index,
-                                key=lambda x: ranquear_metodos(methods, x, avg_len), reverse=True)
-
-        match = sorted_methods[0][1] if len(
-            sorted_methods) > 0 else 'No method found'
-
-        self.method = match.replace('\n', ' ').strip()
+        query = [
+            'analysis',
+            'methodology',
+            'content',
+            'survey',
+            'review',
+            'evaluation',
+            'comparative',
+            'extended',
+            'overview',
+            'state-of-the-art'
+            'discussed',
+            'evaluated',
+            'compared',
+            'paper',
+            'simulation',
+            'utilizing',
+            'investigate',
+            'experiment',
+            'relies'
+
+        ]
+
+        # Metodologias são ranqueadas apenas pelo escore BM25 da query
+        self.method = self.best_sentence(
+            METHOD, query, 0.0, 'No method found')
 
         return self.method
 
@@ -405,86 +411,59 @@ class ScyPaper:
         #   baseado em estruturas gramaticais e palavras-chave
         #
 
-        def ranquear_contribuicoes(list_of_sentences: list[str], sentence: IndexToSentence, avg_len: int) -> float:
-            #
-            #   Essa função ranqueia contribuições baseado na sua posição no texto
-            #   e o escore de query BM25
-            #   De forma que metodologias no começo do texto, com palavras da query
-            #   pontuem mais
-            #
-            query = [
-                'contribuition',
-                'paper',
-                'summarized',
-                'results',
-                'offers',
-                'highlights',
-            ]
-
-            localidade = (1.0 - (sentence.index /
-                                 (len(list_of_sentences) + 1)))
-
-            points = bm25_no_idf(
-                list_of_sentences, sentence.text, ' '.join(query), avg_words=avg_len)
-
-            return points - localidade
-
-        maybe_contrib = set()
-
-        comparative_re = re.compile(
-            r'contribution|contribute|we proposed|based on the results|demonstrate|similar|in this paper|this paper', re.IGNORECASE)
-
-        negative_re = re.compile(
-            r'section|objective', re.IGNORECASE)
-
-        for (index, sentence) in enumerate(self.sentences):
-            if (comparative_re.search(sentence) and not negative_re.search(sentence)):
-                maybe_contrib.add(index)
-                continue
-
-            if (negative_re.search(sentence)):
-                continue
-
-            if (sentence.strip() == ''):
-                continue
-
-            GRAMMAR = [
-                # the main contribution of this paper
-                ChunkRule(
-                    '<DT><JJ><NN><IN><DT><NN>',
-                    'Delimitador, adjetivo, substantivo, preposição, delimitador, substantivo'),
-                # Based on the results of
-                ChunkRule(
-                    '<VBN><IN><DT><NNS><IN>',
-                    'Verbo-presente-participio, preposição, delimitador, substantivo plural, preposição'),
-                # 'gives similar security with
-                ChunkRule(
-                    '<VBZ><JJ><NN><IN>',
-                    'Verbo-presente, adjetivo, substantivo, preposição'),
-            ]
-
-            if self.match_grammar(sentence, GRAMMAR):
-                maybe_contrib.add(index)
+        query = [
+            'contribuition',
+            'paper',
+            'summarized',
+            'results',
+            'offers',
+            'highlights',
+        ]
 
-        contrib_with_index = [IndexToSentence(i, self.sentences[i])
-                              for i in maybe_contrib]
+        # Contribuições no final do texto, com palavras da query, pontuam mais
+        self.contribuitions = self.best_sentence(
+            CONTRIBUITIONS, query, -1.0, 'No contribution found')
 
-        contribs = [obj.text for obj in contrib_with_index]
-
-        avg_len = np.mean([len(obj) for obj in contribs])
-
-        sorted_contribs = sorted(contrib_with_index,
-                                 key=lambda x: ranquear_contribuicoes(contribs, x, avg_len), reverse=True)
+        return self.contribuitions
 
-        match = sorted_contribs[0][1] if len(
-            sorted_contribs) > 0 else 'No contribution found'
 
-        self.contribuitions = match.replace('\n', ' ').strip()
+# Quantidade de termos mais citados mantidos no resultado
+TOP_TERMS = 10
 
-        return self.contribuitions
 
+class PaperResult:
+    #
+    #   Resultado compacto enviado pelos workers ao processo principal
+    #   Contém apenas os campos extraídos e os termos mais citados. As
+    #   referências e o bag of words completo só são incluídos com full=True
+    #
+    __slots__ = ('objective', 'problem', 'method', 'contribuitions',
+                 'top_terms', 'references', 'bag_of_words', 'profile', 'signature')
 
-def show_results(file: str, paper: ScyPaper):
+    objective: str
+    problem: str
+    method: str
+    contribuitions: str
+    top_terms: list[tuple[str, int]]
+    references: list[str] | None
+    bag_of_words: Counter | None
+    profile: dict | None
+    # (tamanho, data de modificação, hash) do PDF lido antes da extração
+    signature: tuple[int, int, str] | None
+
+    def __init__(self, paper: ScyPaper, full: bool = False):
+        self.objective = paper.objective
+        self.problem = paper.problem
+        self.method = paper.method
+        self.contribuitions = paper.contribuitions
+        self.top_terms = paper.bag_of_words.most_common(TOP_TERMS)
+        self.references = paper.references if full else None
+        self.bag_of_words = paper.bag_of_words if full else None
+        self.profile = None
+        self.signature = None
+
+
+def show_results(file: str, paper: PaperResult):
     print("\n=====================================\n")
     print("Arquivo: ", file + '\n')
     print("Objetivo => ", paper.objective + '\n')
@@ -494,8 +473,8 @@ def show_results(file: str, paper: ScyPaper):
 
     print("Termos mais citados =>")
 
-    for word, count in paper.bag_of_words.most_common(10):
-        print(word, str(count))
+    for word, occurrences in paper.top_terms:
+        print(word, str(occurrences))
 
     print('\n')
 
@@ -522,10 +501,10 @@ def write_to_file(file: str, paper: ScyPaper):
     contribuitions.text = paper.contribuitions
 
     most_cited = ElementTree.SubElement(root, 'most_cited')
-    for word, count in paper.bag_of_words.most_common(10):
+    for word, occurrences in paper.bag_of_words.most_common(TOP_TERMS):
         word_node = ElementTree.SubElement(most_cited, 'word')
         word_node.text = word
-        word_node.set('count', str(count))
+        word_node.set('count', str(occurrences))
 
     references = ElementTree.SubElement(root, 'references')
     for ref in paper.references:
@@ -544,55 +523,510 @@ def write_to_file(file: str, paper: ScyPaper):
     with open(file + '.xml', 'wb') as f:
         f.write(content.encode('utf-8'))
 
+    # O mesmo conteúdo vai para o acervo SQLite lido pela interface
+    open_store(os.path.dirname(os.path.abspath(file))).write(
+        os.path.basename(file), paper.objective, paper.problem, paper.method, paper.contribuitions,
+        paper.bag_of_words.most_common(TOP_TERMS), paper.references)
+
+
+# Cache de normalização (stem/lema) compartilhado em disco pelos workers
+_normalization_cache_path: str | None = None
+
+
+def init_worker(normalization_cache_path: str | None = None):
+    global _normalization_cache_path
+
+    preload_resources()
+
+    _normalization_cache_path = normalization_cache_path
+
+    if normalization_cache_path:
+        load_normalization_cache(normalization_cache_path)
 
-def process_file(fullpath: str) -> ScyPaper:
-    text = extrair_texto(fullpath)
+        # ao encerrar, o worker grava as palavras novas que ficaram abaixo
+        # de NORMALIZATION_SAVE_MISSES
+        multiprocessing.util.Finalize(None, flush_normalization_cache, args=(normalization_cache_path,),
+                                      exitpriority=10)
 
-    paper = ScyPaper(text)
 
-    paper.count_words(paper.text)
+def flush_normalization_cache(path: str):
+    try:
+        save_normalization_cache(path)
+    except OSError:
+        # diretório somente leitura, o próximo processo apenas começa frio
+        pass
+
+
+def pipeline_version(prefilter: str = DEFAULT_PREFILTER, batched_tagging: bool = False) -> str:
+    #
+    #   O modo do pré-filtro pode mudar as frases encontradas e a etiquetagem
+    #   em lote os termos mais citados, então fazem parte da versão
+    #   registrada no manifesto
+    #
+    version = PIPELINE_VERSION if prefilter == 'off' else '%s-%s' % (PIPELINE_VERSION, prefilter)
+
+    return version + '-batched' if batched_tagging else version
+
+
+def process_file(fullpath: str, batched_tagging: bool = False, extraction_workers: int | None = None,
+                 full: bool = False, profile: bool = False, prefilter: str = DEFAULT_PREFILTER) -> PaperResult:
+    record = Profile() if profile else None
+
+    extraction_cache = get_cache()
+    cache_counters = (extraction_cache.hits, extraction_cache.misses, stem_cache.hits,
+                      stem_cache.misses, lemma_cache.hits, lemma_cache.misses)
+
+    #
+    #   O PDF pode ser alterado enquanto é processado. A assinatura é lida
+    #   antes da extração e o mesmo hash é a chave do cache de extração,
+    #   de forma que o manifesto registre o conteúdo que foi de fato lido
+    #
+    with stage(record, 'extract'):
+        signature = file_signature(fullpath)
+
+    paper = ScyPaper.from_pages(ler_paginas(
+        fullpath, extraction_workers, signature[2]), record, prefilter=prefilter)
+
+    # a contagem em lote usa as anotações de todas as frases, senão apenas
+    # as frases que passam pelo pré-filtro são etiquetadas
+    if batched_tagging:
+        paper.annotate()
+
+    with stage(record, 'count_words'):
+        paper.count_words(paper.text, batched=batched_tagging)
+
     paper.search_for_contribuitions()
     paper.search_for_objective()
     paper.search_for_problem()
     paper.search_for_methods()
+    paper.release()
 
-    write_to_file(fullpath, paper)
+    with stage(record, 'write_xml'):
+        write_to_file(fullpath, paper)
 
-    return paper
+    # regravar o cache inteiro a cada artigo custaria mais que as palavras novas
+    if _normalization_cache_path:
+        with stage(record, 'save_normalization_cache'):
+            save_normalization_cache(_normalization_cache_path, NORMALIZATION_SAVE_MISSES)
 
+    result = PaperResult(paper, full)
+    result.signature = signature
 
-def main(overrided_path: str | None = None):
-    args_path = sys.argv[1] if len(sys.argv) > 1 else ''
+    if record is not None:
+        names = ('extraction_cache_hits', 'extraction_cache_misses', 'stem_cache_hits',
+                 'stem_cache_misses', 'lemma_cache_hits', 'lemma_cache_misses')
+        current = (extraction_cache.hits, extraction_cache.misses, stem_cache.hits,
+                   stem_cache.misses, lemma_cache.hits, lemma_cache.misses)
 
-    path = overrided_path if overrided_path else args_path
+        for name, before, after in zip(names, cache_counters, current):
+            record.count(name, after - before)
+
+        result.profile = record.to_dict()
+
+    return result
+
+
+def create_executor(path: str, args: argparse.Namespace) -> ProcessPoolExecutor:
+    #
+    #   Pool de workers já aquecidos: cada processo carrega os recursos do
+    #   NLTK e o cache de normalização uma única vez ao iniciar
+    #
+    cache_path = os.path.join(path, NORMALIZATION_CACHE_FILENAME)
+
+    return ProcessPoolExecutor(max_workers=args.workers, max_tasks_per_child=args.max_tasks_per_child,
+                               initializer=init_worker, initargs=(cache_path,))
+
+
+def schedule(path: str, filenames: list[str], order: str) -> list[str]:
+    #
+    #   Ordena os PDFs do maior para o menor (por tamanho do arquivo ou
+    #   número de páginas), de forma que um PDF enorme não seja o último
+    #   a começar e defina sozinho o tempo total da execução
+    #
+    if order == 'size':
+        return sorted(filenames, key=lambda filename: os.path.getsize(os.path.join(path, filename)), reverse=True)
+
+    if order == 'pages':
+        def pages(filename: str) -> int:
+            try:
+                return contar_paginas(os.path.join(path, filename))
+            except Exception:
+                return 0
+
+        return sorted(filenames, key=pages, reverse=True)
+
+    return filenames
+
+
+def watch_directory(path: str, args: argparse.Namespace, summary: ProfileSummary | None = None):
+    #
+    #   Processa continuamente os PDFs que chegam (ou são alterados) no
+    #   diretório usando um pool de workers que permanece aquecido
+    #   O manifesto é salvo uma vez a cada verificação com alterações e o
+    #   índice de busca, cuja gravação percorre todo o acervo, no máximo a
+    #   cada INDEX_SAVE_INTERVAL segundos (e ao sair)
+    #
+    manifest = Manifest.load(path)
+    index = InvertedIndex.load(path)
+    watcher = DirectoryWatcher(path, args.settle)
+    version = pipeline_version(args.prefilter, args.batched_tagging)
+
+    store = open_store(path)
+
+    manifest_changed = False
+    index_changed = False
+    index_saved = time.monotonic()
+
+    for filename in manifest.prune():
+        store.delete(filename)
+        print('Removido: ', filename)
+
+    manifest.save()
+
+    # PDFs removidos enquanto o diretório não era observado, que o watcher
+    # não vai informar porque nunca os viu
+    for filename in list(index.doc_len):
+        if not os.path.isfile(os.path.join(path, filename)):
+            index.remove_document(filename)
+            index_changed = True
+
+    running: dict = dict()
+    resubmit: set[str] = set()
+
+    def forget(filename: str):
+        # PDF removido do diretório
+        manifest.prune()
+        store.delete(filename)
+        index.remove_document(filename)
+        resubmit.discard(filename)
+        print('Removido: ', filename)
+
+    print('Observando', path, '(Ctrl+C para sair)')
+
+    with create_executor(path, args) as executor:
+        try:
+            while True:
+                ready, removed = watcher.poll()
+
+                for filename in removed:
+                    forget(filename)
+
+                if removed:
+                    manifest_changed = index_changed = True
+
+                for filename in schedule(path, ready, args.schedule):
+                    if filename in running.values():
+                        resubmit.add(filename)
+                        continue
+
+                    #
+                    #   O PDF pode ser apagado a qualquer momento, inclusive
+                    #   entre a verificação e a leitura. Nesse caso ele é
+                    #   tratado como removido, sem interromper o laço
+                    #
+                    try:
+                        current = manifest.is_current(filename, version)
+
+                        # XML atualizado, falta no máximo indexar para a busca
+                        if current and filename not in index.doc_len:
+                            index.update_document(filename)
+                            index_changed = True
+                    except OSError:
+                        forget(filename)
+                        manifest_changed = index_changed = True
+                        continue
+
+                    if current:
+                        continue
+
+                    future = executor.submit(process_file, os.path.join(path, filename), args.batched_tagging,
+                                             profile=summary is not None, prefilter=args.prefilter)
+                    running[future] = filename
+
+                idle = not running
+
+                if idle:
+                    done = set()
+                else:
+                    done, _ = wait(running, timeout=args.interval,
+                                   return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    filename = running.pop(future)
+                    fullpath = os.path.join(path, filename)
+
+                    try:
+                        paper = future.result()
+                    except Exception as error:
+                        print('Erro ao processar', fullpath, error)
+                        paper = None
+
+                    if not os.path.isfile(fullpath):
+                        resubmit.discard(filename)
+                        continue
+
+                    if paper is not None:
+                        # registra e indexa a versão do PDF que foi processada
+                        try:
+                            manifest.record(filename, version, paper.signature)
+                            index.update_document(filename, paper.signature)
+                        except OSError:
+                            forget(filename)
+                            manifest_changed = index_changed = True
+                            continue
+
+                        manifest_changed = index_changed = True
+
+                        show_results(fullpath, paper)
+
+                        if summary is not None:
+                            summary.add(fullpath, paper.profile)
+
+                    # alterado durante o processamento (mesmo que tenha falhado)
+                    if filename in resubmit:
+                        resubmit.discard(filename)
+
+                        future = executor.submit(process_file, fullpath, args.batched_tagging,
+                                                 profile=summary is not None, prefilter=args.prefilter)
+                        running[future] = filename
+
+                if manifest_changed:
+                    manifest.save()
+                    manifest_changed = False
+
+                if index_changed and time.monotonic() - index_saved >= INDEX_SAVE_INTERVAL:
+                    index.save()
+                    index_changed = False
+                    index_saved = time.monotonic()
+
+                if idle:
+                    time.sleep(args.interval)
+        except KeyboardInterrupt:
+            for future in running:
+                future.cancel()
+        finally:
+            if manifest_changed:
+                manifest.save()
+
+            if index_changed:
+                index.save()
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description='Extrai objetivo, problema, metodologia e contribuições de artigos científicos')
+
+    parser.add_argument('path', nargs='?', default='',
+                        help='arquivo PDF ou diretório de PDFs')
+    parser.add_argument('--incremental', action='store_true',
+                        help='processa apenas os PDFs novos ou alterados desde a última execução')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='número de processos (padrão: número de CPUs)')
+    parser.add_argument('--max-tasks-per-child', type=int, default=None,
+                        help='artigos processados por worker antes de ser substituído')
+    parser.add_argument('--schedule', choices=['size', 'pages', 'none'], default='size',
+                        help='ordem de envio dos PDFs: maiores primeiro por tamanho ou páginas, ou a ordem do diretório')
+    parser.add_argument('--profile', metavar='ARQUIVO', default=None,
+                        help='registra tempos e contadores de cada etapa em JSON lines e mostra um resumo ao final')
+    parser.add_argument('--prefilter', choices=PREFILTER_MODES, default=DEFAULT_PREFILTER,
+                        help='pré-filtro das gramáticas: off (etiqueta todas as frases), safe (descarta apenas frases sem '
+                        'as palavras exigidas pelas regras) ou fast (também usa sufixos, mais rápido e com menor revocação)')
+    parser.add_argument('--batched-tagging', action='store_true',
+                        help='etiqueta cada artigo inteiro de uma vez para contar os termos mais citados (mais rápido, '
+                        'mas as etiquetas consideram o contexto e os termos podem mudar)')
+    parser.add_argument('--watch', action='store_true',
+                        help='continua executando e processa os PDFs que chegarem no diretório')
+    parser.add_argument('--interval', type=float, default=2.0,
+                        help='intervalo em segundos entre as verificações do modo --watch')
+    parser.add_argument('--settle', type=float, default=2.0,
+                        help='tempo em segundos que um PDF deve ficar sem alterações antes de ser processado')
+
+    return parser.parse_args(argv)
+
+
+def parse_search_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog='main.py search', description='Busca em lote em um diretório de artigos, sem interface gráfica')
+
+    parser.add_argument('path', help='diretório de PDFs')
+    parser.add_argument('--queries', default='-',
+                        help='arquivo com uma busca por linha (padrão: entrada padrão)')
+    parser.add_argument('-k', type=int, default=10,
+                        help='quantidade de artigos retornados por busca')
+    parser.add_argument('--output', default='-',
+                        help='arquivo JSON lines de saída (padrão: saída padrão)')
+    parser.add_argument('--idf', action='store_true',
+                        help='pondera os termos pelo IDF do acervo')
+
+    return parser.parse_args(argv)
+
+
+def search(argv: list[str]) -> int:
+    #
+    #   Carrega o índice uma vez e escreve uma linha JSON por busca, com os
+    #   k artigos mais bem pontuados, à medida que as buscas terminam
+    #
+    args = parse_search_args(argv)
+
+    if not os.path.isdir(args.path):
+        print('Path not found', file=sys.stderr)
+        return 1
+
+    with ExitStack() as stack:
+        # '-' é a entrada ou a saída padrão, que não são fechadas
+        try:
+            queries_file = sys.stdin if args.queries == '-' else stack.enter_context(open(args.queries, 'r'))
+            output = sys.stdout if args.output == '-' else stack.enter_context(open(args.output, 'w'))
+        except OSError as error:
+            print('Erro ao abrir', error.filename, error.strerror, file=sys.stderr)
+            return 1
+
+        queries = (line.strip() for line in queries_file if line.strip())
+
+        for query, results in search_batch(queries, args.path, args.k, args.idf):
+            output.write(json.dumps({'query': query, 'results': [
+                {'file': name, 'score': points} for name, points in results]}) + '\n')
+            output.flush()
+
+    return 0
+
+
+def main(overrided_path: str | None = None, **options):
+    if not overrided_path and sys.argv[1:2] == ['search']:
+        sys.exit(search(sys.argv[2:]))
+
+    args = parse_args([] if overrided_path else sys.argv[1:])
+
+    for name, value in options.items():
+        setattr(args, name, value)
+
+    path = overrided_path if overrided_path else args.path
 
     if not os.path.exists(path) or path == None:
         print('Path not found')
         sys.exit(1)
 
+    summary = ProfileSummary(args.profile) if args.profile else None
+
+    try:
+        run(path, args, summary)
+    finally:
+        if summary is not None:
+            summary.close()
+            summary.show()
+
+
+def run(path: str, args: argparse.Namespace, summary: ProfileSummary | None = None):
+    profile = summary is not None
+
     if os.path.isfile(path) and path.endswith('.pdf'):
-        paper = process_file(path)
+        init_worker(os.path.join(os.path.dirname(path),
+                    NORMALIZATION_CACHE_FILENAME))
+
+        # um único PDF grande tem suas páginas extraídas em paralelo
+        paper = process_file(path, args.batched_tagging, extraction_workers=os.cpu_count(),
+                             profile=profile, prefilter=args.prefilter)
 
         show_results(path, paper)
 
+        flush_normalization_cache(_normalization_cache_path)
+
+        if summary is not None:
+            summary.add(path, paper.profile)
+
+        return
+
+    if os.path.isdir(path) and args.watch:
+        watch_directory(path, args, summary)
+
         return
 
     if os.path.isdir(path):
-        with ProcessPoolExecutor() as executor:
+        for fullpath, paper, _, _ in process_directory(path, args, profile=profile):
+            if paper is None:
+                continue
+
+            show_results(fullpath, paper)
+
+            if summary is not None:
+                summary.add(fullpath, paper.profile)
+
+
+def process_directory(path: str, args: argparse.Namespace, cancel: threading.Event | None = None,
+                      profile: bool = False) -> Iterator[tuple[str, PaperResult | None, int, int]]:
+    #
+    #   Processa os PDFs do diretório no pool de workers, devolvendo cada
+    #   artigo assim que termina junto do progresso (concluídos, total)
+    #   Um PDF que falha é informado com o artigo None e não entra no
+    #   manifesto (será tentado de novo na próxima execução), sem
+    #   interromper os demais
+    #   Se o evento cancel for acionado, os artigos ainda não iniciados
+    #   são cancelados e a geração termina
+    #
+    manifest = Manifest.load(path)
+    version = pipeline_version(args.prefilter, args.batched_tagging)
+
+    filenames = [filename for filename in os.listdir(path)
+                 if filename.endswith('.pdf')]
+
+    if args.incremental:
+        store = open_store(path)
+
+        for filename in manifest.prune():
+            store.delete(filename)
+            print('Removido: ', filename)
+
+        filenames = [filename for filename in filenames
+                     if not manifest.is_current(filename, version)]
+
+    try:
+        with create_executor(path, args) as executor:
             futures = dict()
 
-            for filename in os.listdir(path):
-                if filename.endswith('.pdf'):
-                    fullpath = os.path.join(path, filename)
+            for filename in schedule(path, filenames, args.schedule):
+                fullpath = os.path.join(path, filename)
+
+                futures[executor.submit(process_file, fullpath, args.batched_tagging,
+                                        profile=profile, prefilter=args.prefilter)] = fullpath
+
+            finished = 0
+            pending = set(futures)
+
+            while pending:
+                if cancel is not None and cancel.is_set():
+                    executor.shutdown(wait=True, cancel_futures=True)
+                    return
+
+                done, pending = wait(pending, timeout=0.5,
+                                     return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    fullpath = futures[future]
+                    finished += 1
+
+                    try:
+                        paper = future.result()
+                    except Exception as error:
+                        print('Erro ao processar', fullpath, error)
+
+                        yield fullpath, None, finished, len(futures)
+                        continue
+
+                    manifest.record(os.path.basename(
+                        fullpath), version, paper.signature)
+
+                    yield fullpath, paper, finished, len(futures)
+    finally:
+        manifest.save()
 
-                    futures[executor.submit(process_file, fullpath)] = fullpath
 
-            for future in as_completed(futures):
-                fullpath = futures[future]
+def default_args(**options) -> argparse.Namespace:
+    args = parse_args([])
 
-                paper = future.result()
+    for name, value in options.items():
+        setattr(args, name, value)
 
-                show_results(fullpath, paper)
+    return args
 
 
 if (__name__ == '__main__'):
@@ -0,0 +1,113 @@
+import json
+import os
+
+from cache import file_hash, file_signature
+
+MANIFEST_FILENAME = '.manifest.json'
+
+
+#
+#   Manifesto do diretório de artigos
+#   Guarda, para cada PDF, o tamanho, a data de modificação, o hash do
+#   conteúdo e a versão do pipeline que gerou o seu XML, de forma que
+#   execuções incrementais só reprocessem artigos novos ou alterados
+#
+class Manifest:
+    directory_path: str
+    entries: dict[str, dict]
+
+    def __init__(self, directory_path: str, entries: dict[str, dict] | None = None):
+        self.directory_path = directory_path
+        self.entries = entries if entries is not None else dict()
+
+    @staticmethod
+    def load(directory_path: str) -> 'Manifest':
+        path = os.path.join(directory_path, MANIFEST_FILENAME)
+
+        try:
+            with open(path, 'r') as file:
+                return Manifest(directory_path, json.load(file))
+        except (OSError, ValueError):
+            return Manifest(directory_path)
+
+    def save(self):
+        path = os.path.join(self.directory_path, MANIFEST_FILENAME)
+        tmp_path = '%s.%d.tmp' % (path, os.getpid())
+
+        with open(tmp_path, 'w') as file:
+            json.dump(self.entries, file)
+
+        os.replace(tmp_path, path)
+
+    def is_current(self, filename: str, version: str) -> bool:
+        #
+        #   O XML está atualizado se foi gerado pela mesma versão do
+        #   pipeline a partir do mesmo conteúdo. O hash só é recalculado
+        #   quando o tamanho é o mesmo mas a data de modificação mudou
+        #
+        entry = self.entries.get(filename)
+        fullpath = os.path.join(self.directory_path, filename)
+
+        if entry is None or entry['version'] != version:
+            return False
+
+        if not os.path.isfile(fullpath + '.xml'):
+            return False
+
+        stat = os.stat(fullpath)
+
+        if stat.st_size != entry['size']:
+            return False
+
+        if stat.st_mtime_ns == entry['mtime']:
+            return True
+
+        if file_hash(fullpath) != entry['hash']:
+            return False
+
+        entry['mtime'] = stat.st_mtime_ns
+
+        return True
+
+    def record(self, filename: str, version: str, signature: tuple[int, int, str] | None = None):
+        #
+        #   signature é o (tamanho, data de modificação, hash) do conteúdo
+        #   que foi de fato processado, lido antes da extração. Sem ele o
+        #   arquivo é lido agora, e um PDF alterado durante o processamento
+        #   seria registrado como atualizado
+        #
+        if signature is None:
+            signature = file_signature(os.path.join(self.directory_path, filename))
+
+        size, mtime, digest = signature
+
+        self.entries[filename] = {
+            'size': size,
+            'mtime': mtime,
+            'hash': digest,
+            'version': version,
+        }
+
+    def prune(self) -> list[str]:
+        #
+        #   Remove do manifesto os PDFs que não existem mais e apaga os
+        #   XMLs gerados para eles. Retorna os nomes removidos
+        #
+        removed = []
+
+        for filename in list(self.entries):
+            if not os.path.isfile(os.path.join(self.directory_path, filename)):
+                del self.entries[filename]
+                removed.append(filename)
+
+        for archive in os.listdir(self.directory_path):
+            if not archive.endswith('.pdf.xml'):
+                continue
+
+            if not os.path.isfile(os.path.join(self.directory_path, archive[:-len('.xml')])):
+                os.remove(os.path.join(self.directory_path, archive))
+
+                if archive[:-len('.xml')] not in removed:
+                    removed.append(archive[:-len('.xml')])
+
+        return removed
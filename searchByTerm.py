@@ -1,24 +1,138 @@
-import os
-
-import bm25
-import leitor
-
-def search_by_term(search_term, directory_path):
-    article_corpus = []
-
-    list_of_results = []
-
-    for archive in os.listdir(directory_path):
-        if archive.endswith(".pdf"):
-            archive_path = os.path.join(directory_path, archive)
-            article_corpus.append(leitor.extrair_texto(archive_path))
-    i = 0
-
-    for archive in os.listdir(directory_path):
-        if archive.endswith(".pdf"):
-            points = bm25.bm25_no_idf(
-                article_corpus, article_corpus[i], search_term)
-            i += 1
-            list_of_results.append(points)
-
-    return list_of_results
+import os
+from collections import OrderedDict
+from collections.abc import Iterable, Iterator
+
+import numpy as np
+
+from bm25 import prepare
+from index import InvertedIndex, open_index
+
+# Quantidade de buscas e tamanho total (em bytes) mantidos no cache de resultados
+QUERY_CACHE_SIZE = 128
+QUERY_CACHE_BYTES = 32 * 1024 ** 2
+
+# Índices já abertos neste processo, por diretório
+_indexes: dict[str, InvertedIndex] = dict()
+
+# (diretório, versão do índice, termos da busca) -> (documentos, pontuações)
+# Apenas os documentos com pontuação diferente de zero são guardados
+_query_cache: OrderedDict[tuple, tuple[np.ndarray, np.ndarray]] = OrderedDict()
+_query_cache_bytes = 0
+
+
+def _open(directory_path: str, refresh: bool = True) -> InvertedIndex:
+    #
+    #   Com refresh=False um índice já aberto é usado sem verificar se os
+    #   PDFs do diretório mudaram
+    #
+    index = _indexes.get(directory_path)
+
+    if index is None:
+        index = open_index(directory_path)
+        _indexes[directory_path] = index
+    elif refresh and index.update():
+        index.save()
+
+    return index
+
+
+def _scores(search_term: str, directory_path: str,
+            refresh: bool = True) -> tuple[np.ndarray, np.ndarray, list[str]]:
+    #
+    #   Documentos com pontuação diferente de zero para a busca e as suas
+    #   pontuações, guardados em um cache LRU limitado em entradas e em
+    #   bytes. A chave usa os termos já preparados (buscas que só diferem
+    #   em maiúsculas, pontuação, stop words ou ordem dos termos são a
+    #   mesma) e a versão do índice, que muda a cada PDF indexado
+    #
+    global _query_cache_bytes
+
+    index = _open(directory_path, refresh)
+    scorer, names = index.scorer()
+
+    terms = tuple(sorted(prepare(search_term)))
+    key = (directory_path, index.version, terms)
+
+    cached = _query_cache.get(key)
+
+    if cached is not None:
+        _query_cache.move_to_end(key)
+
+        return cached[0], cached[1], names
+
+    points = scorer.score_terms(list(terms))
+    rows = np.flatnonzero(points).astype(np.int32 if len(points) < 2 ** 31 else np.int64)
+    values = points[rows]
+
+    _query_cache[key] = (rows, values)
+    _query_cache_bytes += rows.nbytes + values.nbytes
+
+    while _query_cache and (len(_query_cache) > QUERY_CACHE_SIZE or _query_cache_bytes > QUERY_CACHE_BYTES):
+        old_rows, old_values = _query_cache.popitem(last=False)[1]
+        _query_cache_bytes -= old_rows.nbytes + old_values.nbytes
+
+    return rows, values, names
+
+
+def top_k(points: np.ndarray, k: int) -> np.ndarray:
+    #
+    #   Posições das k maiores pontuações em ordem decrescente, usando uma
+    #   seleção parcial em vez de ordenar todas as pontuações
+    #
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+
+    if k >= len(points):
+        return np.argsort(-points, kind='stable')
+
+    selected = np.argpartition(-points, k - 1)[:k]
+
+    return selected[np.argsort(-points[selected], kind='stable')]
+
+
+def search_top_k(search_term: str, directory_path: str, k: int = 10,
+                 refresh: bool = True) -> list[tuple[str, float]]:
+    rows, values, names = _scores(search_term, directory_path, refresh)
+
+    results = [(names[rows[i]], float(values[i])) for i in top_k(values, k)]
+
+    if len(results) < k:
+        # completa com os documentos de pontuação zero, na ordem do índice
+        missing = np.ones(len(names), dtype=bool)
+        missing[rows] = False
+
+        results += [(names[i], 0.0) for i in np.flatnonzero(missing)[:k - len(results)]]
+
+    return results
+
+
+def search_batch(queries: Iterable[str], directory_path: str, k: int = 10,
+                 idf: bool = False) -> Iterator[tuple[str, list[tuple[str, float]]]]:
+    #
+    #   Executa várias buscas contra o mesmo acervo, abrindo o índice uma
+    #   única vez. A pontuação de cada termo é calculada uma vez e
+    #   reaproveitada pelas demais buscas que o contém. Os resultados são
+    #   devolvidos à medida que cada busca termina
+    #
+    index = _open(directory_path)
+    scorer, names = index.scorer(idf)
+
+    contributions = dict()
+
+    for query in queries:
+        points = scorer.score_terms(prepare(query), contributions)
+
+        yield query, [(names[i], float(points[i])) for i in top_k(points, k)]
+
+
+def search_by_term(search_term, directory_path):
+    rows, values, names = _scores(search_term, directory_path)
+    points = {names[row]: value for row, value in zip(rows.tolist(), values.tolist())}
+
+    list_of_results = []
+
+    for archive in os.listdir(directory_path):
+        if archive.endswith(".pdf"):
+            list_of_results.append(points.get(archive, 0.0))
+
+    return list_of_results
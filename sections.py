@@ -0,0 +1,93 @@
+import re
+from collections import namedtuple
+
+#
+#   Segmentação do texto de um artigo em resumo, corpo e referências
+#   Todas as seções são encontradas em uma única passada e guardadas
+#   como posições no texto original, que só é fatiado uma vez por seção
+#
+
+_abstract_re = re.compile(r'abstract', re.IGNORECASE)
+_references_re = re.compile(r'references', re.IGNORECASE)
+_bibliography_re = re.compile(r'references|bibliography', re.IGNORECASE)
+
+# ([1]  X ...) [2]
+_marker_re = re.compile(r'\[[0-9]+\]')
+
+# Posições no texto original:
+#   start/end: texto sem os espaços das pontas
+#   abstract: início da palavra "abstract" (ou start, se não houver)
+#   body_start/body_end: corpo, do fim de "abstract" até "references"
+#   references: início da lista de referências, após "references" ou "bibliography"
+Sections = namedtuple(
+    'Sections', ['start', 'abstract', 'body_start', 'body_end', 'references', 'end'])
+
+
+def _skip_spaces(text: str, start: int, end: int) -> int:
+    while start < end and text[start].isspace():
+        start += 1
+
+    return start
+
+
+def segment(text: str) -> Sections:
+    end = len(text)
+
+    while end > 0 and text[end - 1].isspace():
+        end -= 1
+
+    start = _skip_spaces(text, 0, end)
+
+    abstract = _abstract_re.search(text, start, end)
+    body_start = _skip_spaces(text, abstract.end() if abstract else start, end)
+
+    # o corpo termina na primeira ocorrência de "references" após o resumo
+    references_heading = _references_re.search(text, body_start, end)
+    body_end = references_heading.start() if references_heading else end
+
+    # as referências começam após a primeira ocorrência no texto todo
+    bibliography = _bibliography_re.search(text, start, end)
+
+    return Sections(start, abstract.start() if abstract else start, body_start, body_end,
+                    bibliography.end() if bibliography else start, end)
+
+
+def body(text: str, sections: Sections | None = None) -> str:
+    if sections is None:
+        sections = segment(text)
+
+    return text[sections.body_start:sections.body_end]
+
+
+def split_references(text: str, sections: Sections | None = None) -> list[str]:
+    #
+    #   Cada referência vai do marcador "[n]" até o fim da sua linha e
+    #   segue pelas linhas seguintes até o próximo marcador (ou o fim do
+    #   texto). Os marcadores são encontrados uma única vez, então a
+    #   divisão é linear no tamanho da bibliografia
+    #
+    if sections is None:
+        sections = segment(text)
+
+    end = sections.end
+    markers = [match.start() for match in _marker_re.finditer(
+        text, sections.references, end)]
+
+    references = []
+    i = 0
+
+    while i < len(markers):
+        start = markers[i]
+
+        line_end = text.find('\n', start, end)
+        line_end = end if line_end == -1 else line_end
+
+        # próximo marcador a partir do fim da linha
+        while i < len(markers) and markers[i] < line_end:
+            i += 1
+
+        stop = markers[i] if i < len(markers) else end
+
+        references.append(text[start:stop].replace('\n', ' ').strip())
+
+    return references
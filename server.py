@@ -0,0 +1,229 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import searchByTerm
+from client import SERVER_HOST, SERVER_PORT
+from store import open_store
+from text import preload_resources
+
+# Intervalo máximo, em segundos, entre verificações dos PDFs de um diretório
+REFRESH_INTERVAL = 30.0
+
+# Arquivos escritos pelo main.py ao terminar cada artigo
+OUTPUT_FILENAMES = ('.manifest.json', '.corpus.sqlite', '.corpus.sqlite-wal')
+
+
+#
+#   Estado de um diretório mantido em memória pelo servidor
+#   O índice só é sincronizado com os PDFs quando o main.py grava novas
+#   saídas (manifesto ou acervo) ou após REFRESH_INTERVAL segundos, então
+#   as buscas comuns não listam o diretório
+#
+class Corpus:
+    directory_path: str
+    signature: tuple | None
+    checked: float
+
+    def __init__(self, directory_path: str):
+        self.directory_path = directory_path
+        self.signature = None
+        self.checked = 0.0
+
+    def outputs_signature(self) -> tuple:
+        signature = []
+
+        for filename in OUTPUT_FILENAMES:
+            try:
+                stat = os.stat(os.path.join(self.directory_path, filename))
+                signature.append((stat.st_size, stat.st_mtime_ns))
+            except OSError:
+                signature.append(None)
+
+        return tuple(signature)
+
+    def refresh(self) -> bool:
+        #
+        #   Retorna se o índice deve ser sincronizado antes da próxima busca
+        #
+        now = time.monotonic()
+        signature = self.outputs_signature()
+
+        if signature == self.signature and now - self.checked < REFRESH_INTERVAL:
+            return False
+
+        self.signature = signature
+        self.checked = now
+
+        return True
+
+
+#
+#   Apenas os diretórios informados ao iniciar são servidos: o servidor
+#   escreve índices e acervos nos diretórios que busca, então não pode
+#   aceitar um diretório qualquer vindo de outro programa (ou de uma página
+#   aberta no navegador)
+#
+class SearchServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], directories: list[str]):
+        super().__init__(address, SearchHandler)
+
+        self.corpora: dict[str, Corpus] = {
+            os.path.abspath(directory_path): Corpus(os.path.abspath(directory_path))
+            for directory_path in directories}
+        # nomes aceitos no cabeçalho Host, contra páginas que apontam o
+        # próprio domínio para 127.0.0.1
+        self.hosts = {'127.0.0.1', 'localhost', '::1', address[0].lower()}
+        # índices, acervos e caches de busca não são seguros entre threads
+        self.lock = threading.Lock()
+
+    def corpus(self, directory_path: str) -> Corpus | None:
+        return self.corpora.get(os.path.abspath(directory_path))
+
+    def allowed_host(self, host: str | None) -> bool:
+        if not host:
+            return False
+
+        return urllib.parse.urlsplit('//' + host).hostname in self.hosts
+
+    def search(self, corpus: Corpus, query: str, k: int) -> list[tuple[str, float]]:
+        with self.lock:
+            return searchByTerm.search_top_k(query, corpus.directory_path, k, refresh=corpus.refresh())
+
+    def paper(self, corpus: Corpus, paper_id: str) -> dict | None:
+        with self.lock:
+            store = open_store(corpus.directory_path)
+            paper = store.read(paper_id)
+
+            if paper is None:
+                return None
+
+            filename, objective, problem, method, contribuitions, most_cited = paper
+
+            return {
+                'file': filename,
+                'objective': objective,
+                'problem': problem,
+                'method': method,
+                'contribuitions': contribuitions,
+                'most_cited': [[word, int(count)] for count, word in most_cited[1:]],
+                'references': store.references(paper_id),
+            }
+
+    def papers(self, corpus: Corpus) -> list[str]:
+        with self.lock:
+            return open_store(corpus.directory_path).ids()
+
+
+class SearchHandler(BaseHTTPRequestHandler):
+    #
+    #   GET /health
+    #   GET /search?dir=<diretório>&q=<busca>&k=<quantidade>
+    #   GET /papers?dir=<diretório>
+    #   GET /paper?dir=<diretório>&id=<nome do PDF>
+    #
+    server: SearchServer
+
+    def do_GET(self):
+        if not self.server.allowed_host(self.headers.get('Host')):
+            return self.reply(403, {'error': 'host not allowed'})
+
+        url = urllib.parse.urlsplit(self.path)
+        params = {name: values[0]
+                  for name, values in urllib.parse.parse_qs(url.query).items()}
+
+        if url.path == '/health':
+            return self.reply(200, {'status': 'ok'})
+
+        directory_path = params.get('dir')
+        corpus = self.server.corpus(directory_path) if directory_path else None
+
+        if corpus is None:
+            return self.reply(404, {'error': 'directory not found'})
+
+        try:
+            if url.path == '/search':
+                results = self.server.search(
+                    corpus, params.get('q', ''), int(params.get('k', 10)))
+
+                return self.reply(200, {'results': results})
+
+            if url.path == '/papers':
+                return self.reply(200, {'papers': self.server.papers(corpus)})
+
+            if url.path == '/paper':
+                paper = self.server.paper(corpus, params.get('id', ''))
+
+                if paper is None:
+                    return self.reply(404, {'error': 'paper not found'})
+
+                return self.reply(200, paper)
+        except ValueError as error:
+            return self.reply(400, {'error': str(error)})
+        except Exception as error:
+            return self.reply(500, {'error': str(error)})
+
+        self.reply(404, {'error': 'not found'})
+
+    def reply(self, status: int, content: dict):
+        body = json.dumps(content).encode('utf-8')
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description='Servidor local que mantém os índices de busca em memória')
+
+    parser.add_argument('directories', nargs='+',
+                        help='diretórios servidos (pedidos de outros diretórios são recusados)')
+    parser.add_argument('--host', default=SERVER_HOST)
+    parser.add_argument('--port', type=int, default=SERVER_PORT)
+
+    return parser.parse_args(argv)
+
+
+def run(argv: list[str]) -> int:
+    args = parse_args(argv)
+
+    # recursos do NLTK carregados uma única vez, antes da primeira busca
+    preload_resources()
+
+    for directory_path in args.directories:
+        if not os.path.isdir(directory_path):
+            print('Path not found:', directory_path)
+            return 1
+
+    server = SearchServer((args.host, args.port), args.directories)
+
+    for corpus in server.corpora.values():
+        server.search(corpus, '', 1)
+
+    print('Servidor de busca em http://%s:%d (Ctrl+C para sair)' % (args.host, args.port))
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(run(sys.argv[1:]))
@@ -0,0 +1,250 @@
+import argparse
+import heapq
+import json
+import os
+import sys
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+
+from bm25 import BM25, idf_weight, prepare
+from index import InvertedIndex, open_index
+from searchByTerm import top_k
+from text import preload_resources
+
+# Arquivo com a lista de diretórios (shards) registrados
+SHARDS_FILE = os.environ.get('NLP_UEM_SHARDS', os.path.join(
+    os.path.expanduser('~'), '.config', 'nlp-uem', 'shards.json'))
+
+
+#
+#   Registro dos diretórios de artigos (ex: um por conferência e ano)
+#   buscados em conjunto. Cada diretório mantém o seu próprio índice,
+#   então adicionar um ano novo só indexa os PDFs desse diretório
+#
+class ShardRegistry:
+    path: str
+    directories: list[str]
+
+    def __init__(self, path: str = SHARDS_FILE, directories: list[str] | None = None):
+        self.path = path
+        self.directories = directories if directories is not None else []
+
+    @staticmethod
+    def load(path: str = SHARDS_FILE) -> 'ShardRegistry':
+        try:
+            with open(path, 'r') as file:
+                return ShardRegistry(path, json.load(file)['shards'])
+        except (OSError, ValueError, KeyError):
+            return ShardRegistry(path)
+
+    def save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+        tmp_path = self.path + '.tmp'
+
+        with open(tmp_path, 'w') as file:
+            json.dump({'shards': self.directories}, file, indent=2)
+
+        os.replace(tmp_path, self.path)
+
+    def add(self, directory_path: str) -> bool:
+        directory_path = os.path.abspath(directory_path)
+
+        if directory_path in self.directories:
+            return False
+
+        self.directories.append(directory_path)
+
+        return True
+
+    def remove(self, directory_path: str) -> bool:
+        directory_path = os.path.abspath(directory_path)
+
+        if directory_path not in self.directories:
+            return False
+
+        self.directories.remove(directory_path)
+
+        return True
+
+
+class Shard:
+    directory_path: str
+    index: InvertedIndex
+
+    def __init__(self, directory_path: str):
+        self.directory_path = directory_path
+        self.index = open_index(directory_path)
+        self.index.scorer()
+        self._scorer = None
+
+    def document_frequencies(self, terms: set[str]) -> dict[str, int]:
+        scorer, _ = self.index.scorer()
+        frequencies = dict()
+
+        for term in terms:
+            col = scorer.vocabulary.get(term)
+            frequencies[term] = scorer.document_frequency(col) if col is not None else 0
+
+        return frequencies
+
+    def scorer(self, avg_words: float) -> tuple[BM25, list[str]]:
+        #
+        #   BM25 sobre as listas deste índice, mas normalizado pelo tamanho
+        #   médio dos documentos de todos os shards. Fica guardado até o
+        #   índice ou o tamanho médio mudarem
+        #
+        key = (self.index.version, avg_words)
+
+        if self._scorer is None or self._scorer[0] != key:
+            local, names = self.index.scorer()
+            scorer = BM25(local.vocabulary, local.indptr, local.indices, local.data, local.doc_len,
+                          avg_words=avg_words)
+
+            self._scorer = (key, scorer, names)
+
+        return self._scorer[1], self._scorer[2]
+
+    def search(self, terms: list[str], k: int, avg_words: float,
+               weights: dict[str, float] | None) -> list[tuple[float, str, str]]:
+        scorer, names = self.scorer(avg_words)
+        points = scorer.score_terms(terms, weights=weights)
+
+        return [(float(points[i]), self.directory_path, names[i]) for i in top_k(points, k)]
+
+
+#
+#   Busca em vários shards ao mesmo tempo
+#   Cada busca é preparada uma vez, as estatísticas globais (número de
+#   documentos, tamanho médio e, com idf=True, a frequência de cada termo
+#   somada em todos os shards) são calculadas, e cada shard pontua os seus
+#   documentos com elas em paralelo, devolvendo os seus k melhores. Como
+#   as estatísticas são as mesmas, as pontuações de shards diferentes são
+#   comparáveis e os k melhores de todos saem da junção dessas listas
+#   Abrir e atualizar os shards usa o NLTK e os caches de normalização,
+#   que não são seguros entre threads, então é feito um shard por vez e
+#   apenas a pontuação (NumPy) roda em paralelo
+#
+class ShardedCorpus:
+    shards: list[Shard]
+
+    def __init__(self, directories: Iterable[str], workers: int | None = None):
+        directories = [os.path.abspath(directory) for directory in directories]
+
+        self.shards = [Shard(directory) for directory in directories]
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers or max(1, min(len(directories), os.cpu_count() or 1)))
+
+    @property
+    def num_docs(self) -> int:
+        return sum(len(shard.index.doc_len) for shard in self.shards)
+
+    @property
+    def avg_len(self) -> float:
+        num_docs = self.num_docs
+
+        return sum(shard.index.total_len for shard in self.shards) / num_docs if num_docs else 0.0
+
+    def weights(self, terms: list[str]) -> dict[str, float]:
+        unique = set(terms)
+        num_docs = self.num_docs
+
+        frequencies = dict.fromkeys(unique, 0)
+
+        for shard in self.shards:
+            for term, df in shard.document_frequencies(unique).items():
+                frequencies[term] += df
+
+        return {term: idf_weight(num_docs, df) for term, df in frequencies.items()}
+
+    def search(self, query: str, k: int = 10, idf: bool = False) -> list[tuple[str, str, float]]:
+        #
+        #   Retorna (diretório, arquivo, pontuação) dos k melhores artigos
+        #
+        terms = prepare(query)
+        avg_len = self.avg_len
+        weights = self.weights(terms) if idf else None
+
+        results = self.executor.map(
+            lambda shard: shard.search(terms, k, avg_len, weights), self.shards)
+
+        return [(directory, name, points) for points, directory, name in
+                heapq.nlargest(k, (result for shard_results in results for result in shard_results),
+                               key=lambda result: result[0])]
+
+    def close(self):
+        self.executor.shutdown()
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description='Registro e busca em vários diretórios de artigos (shards)')
+    parser.add_argument('--registry', default=SHARDS_FILE,
+                        help='arquivo com a lista de shards')
+
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    add = commands.add_parser('add', help='registra um diretório, criando o seu índice')
+    add.add_argument('path')
+
+    remove = commands.add_parser('remove', help='remove um diretório do registro')
+    remove.add_argument('path')
+
+    commands.add_parser('list', help='lista os diretórios registrados')
+
+    search = commands.add_parser('search', help='busca em todos os shards')
+    search.add_argument('query')
+    search.add_argument('-k', type=int, default=10)
+    search.add_argument('--idf', action='store_true',
+                        help='pondera os termos pelo IDF de todos os shards')
+    search.add_argument('--workers', type=int, default=None)
+
+    return parser.parse_args(argv)
+
+
+def run(argv: list[str]) -> int:
+    args = parse_args(argv)
+    registry = ShardRegistry.load(args.registry)
+
+    if args.command == 'add':
+        if not os.path.isdir(args.path):
+            print('Path not found')
+            return 1
+
+        # cria (ou atualiza) o índice apenas deste diretório
+        preload_resources()
+        open_index(args.path)
+
+        if registry.add(args.path):
+            registry.save()
+
+        return 0
+
+    if args.command == 'remove':
+        if registry.remove(args.path):
+            registry.save()
+
+        return 0
+
+    if args.command == 'list':
+        for directory in registry.directories:
+            print(directory)
+
+        return 0
+
+    # recursos do NLTK carregados uma única vez, antes de abrir os shards
+    preload_resources()
+
+    corpus = ShardedCorpus(registry.directories, args.workers)
+
+    try:
+        for directory, name, points in corpus.search(args.query, args.k, args.idf):
+            print('%10.4f  %s' % (points, os.path.join(directory, name)))
+    finally:
+        corpus.close()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(run(sys.argv[1:]))
@@ -0,0 +1,132 @@
+import os
+import sqlite3
+from xml.etree import ElementTree
+
+STORE_FILENAME = '.corpus.sqlite'
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS papers (
+    id TEXT PRIMARY KEY,
+    objective TEXT,
+    problem TEXT,
+    method TEXT,
+    contribuitions TEXT
+);
+CREATE TABLE IF NOT EXISTS terms (
+    paper_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    word TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (paper_id, position)
+);
+CREATE TABLE IF NOT EXISTS paper_references (
+    paper_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    PRIMARY KEY (paper_id, position)
+);
+'''
+
+
+#
+#   Acervo em um único arquivo SQLite (modo WAL) no diretório dos
+#   artigos, com os campos extraídos, os termos mais citados e as
+#   referências de cada artigo indexados pelo nome do PDF
+#   Vários workers podem escrever ao mesmo tempo e a interface lê sem
+#   precisar listar o diretório ou interpretar XMLs
+#
+class CorpusStore:
+    directory_path: str
+    connection: sqlite3.Connection
+    pid: int
+
+    def __init__(self, directory_path: str):
+        self.directory_path = directory_path
+        self.pid = os.getpid()
+        self.connection = sqlite3.connect(os.path.join(
+            directory_path, STORE_FILENAME), timeout=60, check_same_thread=False)
+
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(_SCHEMA)
+
+    def write(self, paper_id: str, objective: str, problem: str, method: str, contribuitions: str,
+              most_cited: list[tuple[str, int]], references: list[str]):
+        with self.connection:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO papers VALUES (?, ?, ?, ?, ?)',
+                (paper_id, objective, problem, method, contribuitions))
+
+            self.connection.execute(
+                'DELETE FROM terms WHERE paper_id = ?', (paper_id,))
+            self.connection.executemany(
+                'INSERT INTO terms VALUES (?, ?, ?, ?)',
+                [(paper_id, i, word, count) for i, (word, count) in enumerate(most_cited)])
+
+            self.connection.execute(
+                'DELETE FROM paper_references WHERE paper_id = ?', (paper_id,))
+            self.connection.executemany(
+                'INSERT INTO paper_references VALUES (?, ?, ?)',
+                [(paper_id, i, ref) for i, ref in enumerate(references)])
+
+    def read(self, paper_id: str):
+        #
+        #   Mesmo formato retornado por leitor.xml_reader, ou None se o
+        #   artigo não estiver no acervo
+        #
+        row = self.connection.execute(
+            'SELECT id, objective, problem, method, contribuitions FROM papers WHERE id = ?',
+            (paper_id,)).fetchone()
+
+        if row is None:
+            return None
+
+        most_cited = [('Quant', 'Termo')] + [
+            (str(count), word) for word, count in self.connection.execute(
+                'SELECT word, count FROM terms WHERE paper_id = ? ORDER BY position', (paper_id,))]
+
+        return (*row, most_cited)
+
+    def import_xml(self, xml_path: str):
+        #
+        #   Copia para o acervo um XML gerado antes da existência do acervo
+        #
+        root = ElementTree.parse(xml_path).getroot()
+
+        self.write(root.find('filename').text,
+                   *(root.find(tag).text for tag in ('objective', 'problem', 'method', 'contribuitions')),
+                   [(node.text, int(node.attrib['count'])) for node in root.find('most_cited')],
+                   [node.text or '' for node in root.find('references')])
+
+    def references(self, paper_id: str) -> list[str]:
+        return [text for text, in self.connection.execute(
+            'SELECT text FROM paper_references WHERE paper_id = ? ORDER BY position', (paper_id,))]
+
+    def ids(self) -> list[str]:
+        return [paper_id for paper_id, in self.connection.execute('SELECT id FROM papers')]
+
+    def delete(self, paper_id: str):
+        with self.connection:
+            for table, column in (('papers', 'id'), ('terms', 'paper_id'), ('paper_references', 'paper_id')):
+                self.connection.execute(
+                    'DELETE FROM %s WHERE %s = ?' % (table, column), (paper_id,))
+
+    def close(self):
+        self.connection.close()
+
+
+# Acervos já abertos, por diretório. Uma conexão herdada pelo fork de
+# um worker não pode ser usada, então cada processo abre a sua
+_stores: dict[str, CorpusStore] = dict()
+
+
+def open_store(directory_path: str) -> CorpusStore:
+    directory_path = os.path.abspath(directory_path)
+
+    store = _stores.get(directory_path)
+
+    if store is None or store.pid != os.getpid():
+        store = CorpusStore(directory_path)
+        _stores[directory_path] = store
+
+    return store
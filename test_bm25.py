@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+try:
+    import bm25
+except LookupError:
+    # text.py carrega as stop words do NLTK na importação
+    pytest.skip('dados do NLTK ausentes, execute python download.py', allow_module_level=True)
+
+from bm25 import BM25, bm25_no_idf, idf_weight, term_score
+
+CORPUS = [
+    'security network security protocol',
+    'deep learning network model',
+    'security model evaluation evaluation evaluation',
+    'protocol',
+]
+
+QUERIES = ['security', 'network model', 'evaluation security security', 'missing', 'protocol protocol']
+
+
+@pytest.fixture(autouse=True)
+def tokenized(monkeypatch):
+    # os textos já estão preparados, o teste é da pontuação
+    monkeypatch.setattr(bm25, 'prepare', str.split)
+
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_from_corpus_matches_bm25_no_idf(query):
+    scorer = BM25.from_corpus(CORPUS)
+
+    expected = [bm25_no_idf(CORPUS, doc, query) for doc in CORPUS]
+
+    assert np.allclose(scorer.score(query), expected)
+
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_idf_weights_each_term(query):
+    scorer = BM25.from_corpus(CORPUS, idf=True)
+    documents = [doc.split() for doc in CORPUS]
+    avg_words = np.mean([len(words) for words in documents])
+
+    expected = []
+
+    for words in documents:
+        points = 0.0
+
+        for term in query.split():
+            df = sum(term in other for other in documents)
+
+            if df:
+                points += idf_weight(len(documents), df) * term_score(words.count(term), len(words), avg_words)
+
+        expected.append(points)
+
+    assert np.allclose(scorer.score(query), expected)
@@ -0,0 +1,38 @@
+import random
+
+import nltk
+from nltk.chunk import RegexpChunkParser
+
+from grammar import GRAMMARS, match_grammars
+
+TAGS = ['DT', 'NN', 'NNS', 'NNP', 'VB', 'VBZ', 'VBP', 'VBN', 'VBG', 'VBD', 'JJ', 'IN', 'PRP',
+        'CD', 'MD', 'TO', 'CC', 'RB', ',', '.']
+
+
+def match_grammar_parser(tags: tuple[str, ...], category: str) -> bool:
+    #
+    #   Implementação anterior (ScyPaper.match_grammar): monta a árvore e
+    #   procura um chunk MATCHED gerado pelo RegexpChunkParser
+    #
+    tree = nltk.Tree('DOC', [('w', tag) for tag in tags])
+    chunks = RegexpChunkParser(GRAMMARS[category], chunk_label='MATCHED').parse(tree)
+
+    return any(chunk.label() == 'MATCHED' for chunk in chunks.subtrees())
+
+
+def test_random_tag_sequences_match_parser():
+    rng = random.Random(4)
+
+    for _ in range(3000):
+        tags = tuple(rng.choice(TAGS) for _ in range(rng.randint(1, 12)))
+        expected = {category for category in GRAMMARS if match_grammar_parser(tags, category)}
+
+        assert match_grammars(tags) == expected, tags
+
+
+def test_categories_subset():
+    tags = ('PRP', 'VBP', 'DT', 'JJ', 'NN')
+
+    assert match_grammars(tags) == {'objective', 'method'}
+    assert match_grammars(tags, ['method']) == {'method'}
+    assert match_grammars(tags, ['problem']) == set()
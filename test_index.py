@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+try:
+    import index
+    from bm25 import BM25
+except LookupError:
+    # text.py carrega as stop words do NLTK na importação
+    pytest.skip('dados do NLTK ausentes, execute python download.py', allow_module_level=True)
+
+from index import MAPPED_INDEX_FILENAME, InvertedIndex
+
+DOCUMENTS = {
+    'a.pdf': 'security network security protocol',
+    'b.pdf': 'deep learning network model',
+    'c.pdf': 'security model evaluation evaluation evaluation',
+    'd.pdf': 'protocol',
+}
+
+QUERIES = [['security'], ['network', 'model'], ['evaluation', 'security', 'security'], ['missing']]
+
+
+@pytest.fixture
+def saved(tmp_path, monkeypatch) -> InvertedIndex:
+    # os documentos já estão preparados, o teste é do armazenamento
+    monkeypatch.setattr(index, 'prepare', str.split)
+
+    built = InvertedIndex(str(tmp_path))
+
+    for name, text in DOCUMENTS.items():
+        built.add_document(name, text)
+
+    built.save()
+
+    return built
+
+
+def expected_scores(built: InvertedIndex, terms: list[str], idf: bool) -> dict[str, float]:
+    scorer, names = BM25.from_postings(built.postings, built.doc_len, idf=idf)
+    points = scorer.score_terms(terms)
+
+    return {names[i]: points[i] for i in range(len(names))}
+
+
+def mapped_scores(loaded: InvertedIndex, terms: list[str], idf: bool) -> dict[str, float]:
+    scorer, names = loaded.scorer(idf)
+    points = scorer.score_terms(terms)
+
+    return {names[i]: points[i] for i in range(len(names))}
+
+
+@pytest.mark.parametrize('idf', [False, True])
+def test_mapped_scores_match_postings(saved, tmp_path, idf):
+    loaded = InvertedIndex.load(str(tmp_path))
+
+    assert loaded._mapped is not None
+    assert loaded.doc_len == saved.doc_len
+
+    for terms in QUERIES:
+        expected = expected_scores(saved, terms, idf)
+        actual = mapped_scores(loaded, terms, idf)
+
+        assert actual.keys() == expected.keys()
+        assert np.allclose([actual[name] for name in expected], list(expected.values()))
+
+
+def test_changes_after_load_are_saved(saved, tmp_path):
+    loaded = InvertedIndex.load(str(tmp_path))
+
+    loaded.remove_document('b.pdf')
+    loaded.add_document('e.pdf', 'network security')
+    loaded.save()
+
+    reloaded = InvertedIndex.load(str(tmp_path))
+
+    assert set(reloaded.doc_len) == {'a.pdf', 'c.pdf', 'd.pdf', 'e.pdf'}
+    assert reloaded.postings == loaded.postings
+
+    for terms in QUERIES:
+        expected = expected_scores(loaded, terms, False)
+        actual = mapped_scores(reloaded, terms, False)
+
+        assert np.allclose([actual[name] for name in expected], list(expected.values()))
+
+
+def test_truncated_file_is_ignored(saved, tmp_path):
+    path = tmp_path / MAPPED_INDEX_FILENAME
+    path.write_bytes(path.read_bytes()[:-200])
+
+    assert InvertedIndex.load(str(tmp_path)).doc_len == dict()
@@ -0,0 +1,66 @@
+import random
+import re
+
+from sections import body, split_references
+
+#
+#   Implementações anteriores (ScyPaper.clear_text e find_references),
+#   usadas como referência para a segmentação em uma única passada
+#
+
+
+def clear_text_regex(text: str) -> str:
+    until_abstract = re.compile(
+        r'[\s\S]*?abstract', re.IGNORECASE | re.MULTILINE)
+
+    r = re.sub(until_abstract, '', text.strip(), count=1)
+
+    after_references = re.compile(
+        r'references[\s\S]*', re.IGNORECASE | re.MULTILINE)
+
+    return re.sub(after_references, '', r.strip(), count=1)
+
+
+def find_references_regex(text: str) -> list[str]:
+    until_references = re.compile(
+        r'[\s\S]*?(references|bibliography)', re.IGNORECASE | re.MULTILINE)
+
+    isolated = re.sub(until_references, '', text.strip(), count=1)
+
+    references = re.findall(r'(\[[0-9]+\].*[\s\S]*?(?=\[[0-9]+\]|$))', isolated)
+
+    return [reference.replace('\n', ' ').strip() for reference in references]
+
+
+PIECES = ['abstract', 'Abstract', 'ABSTRACT', 'abs', 'references', 'References', 'REFERENCES',
+          'refer', 'bibliography', 'Bibliography', '[1]', '[2]', '[17]', '[', ']', '[x]', '1',
+          'word', 'text', ' ', '  ', '\n', '\n\n', '\t', '\r\n', '.']
+
+
+def random_text(rng: random.Random) -> str:
+    return ''.join(rng.choice(PIECES) for _ in range(rng.randint(0, 40)))
+
+
+def test_fixed_text():
+    text = '''  Title
+Abstract  We propose a method.
+Body text.
+References
+[1] A. Author, first
+paper. [2] B. Author
+[3] C. Author, third
+'''
+
+    assert body(text) == clear_text_regex(text)
+    assert split_references(text) == find_references_regex(text)
+    assert split_references(text) == ['[1] A. Author, first paper.', '[2] B. Author', '[3] C. Author, third']
+
+
+def test_random_texts_match_regexes():
+    rng = random.Random(21)
+
+    for _ in range(5000):
+        text = random_text(rng)
+
+        assert body(text) == clear_text_regex(text), repr(text)
+        assert split_references(text) == find_references_regex(text), repr(text)
@@ -1,8 +1,12 @@
 
+import json
+import os
 import re
 import string
 import sys
-from functools import reduce
+from collections import OrderedDict
+from collections.abc import Callable, Iterable
+from functools import lru_cache, reduce
 
 import nltk
 from nltk.corpus import stopwords
@@ -46,24 +50,155 @@ def remove_numbers(text: list[str]):
     return [w for w in text if not w.isdigit()]
 
 
+@lru_cache(maxsize=65536)
+def is_delimiter(word: str) -> bool:
+    # etiqueta a palavra isoladamente, o resultado depende apenas dela
+    return nltk.pos_tag([word])[0][1] == 'DT'
+
+
 def remove_delimiters(text: list[str]):
-    return [w for w in text if nltk.pos_tag([w])[0][1] != 'DT']
+    return [w for w in text if not is_delimiter(w)]
+
+
+def remove_delimiters_batched(text: list[str]):
+    #
+    #   Etiqueta todo o texto em uma única chamada. As etiquetas passam a
+    #   considerar o contexto, então o resultado pode diferir do
+    #   remove_delimiters
+    #
+    return [w for w, pos in nltk.pos_tag(text) if pos != 'DT']
 
 
 def remove_punctuation(text: list[str]):
     return [w for w in text if w not in puctuation]
 
 
-def to_stem(text: list[str]):
-    stemmer = PorterStemmer()
+#
+#   Cache LRU limitado de palavra para forma normalizada (stem ou lema)
+#   As mesmas palavras se repetem entre frases, artigos e buscas, então
+#   cada uma é normalizada uma única vez por processo
+#
+class NormalizationCache:
+    normalize: Callable[[str], str]
+    maxsize: int
+    entries: OrderedDict[str, str]
+    hits: int
+    misses: int
+    unsaved: int
 
-    return [stemmer.stem(word) for word in text]
+    def __init__(self, normalize: Callable[[str], str], maxsize: int = 100_000):
+        self.normalize = normalize
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.unsaved = 0
 
+    def __call__(self, word: str) -> str:
+        value = self.entries.get(word)
 
-def to_lemmatize(text: list[str]):
-    lemmatizer = WordNetLemmatizer()
+        if value is not None:
+            self.entries.move_to_end(word)
+            self.hits += 1
+
+            return value
+
+        self.misses += 1
+
+        value = self.normalize(word)
+
+        self.entries[word] = value
+        self.unsaved += 1
+
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+        return value
 
-    return [lemmatizer.lemmatize(word) for word in text]
+    def update(self, entries: Iterable[tuple[str, str]]):
+        for word, value in entries:
+            self.entries[word] = value
+
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def info(self) -> dict[str, int]:
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self.entries)}
+
+
+NORMALIZATION_CACHE_FILENAME = '.normalization.json'
+
+# Palavras novas que um worker acumula antes de regravar o cache em disco
+NORMALIZATION_SAVE_MISSES = 5_000
+
+stem_cache = NormalizationCache(PorterStemmer().stem)
+lemma_cache = NormalizationCache(WordNetLemmatizer().lemmatize)
+
+
+def to_stem(text: list[str]):
+    return [stem_cache(word) for word in text]
+
+
+def to_lemmatize(text: list[str]):
+    return [lemma_cache(word) for word in text]
+
+
+def preload_resources():
+    #
+    #   Carrega de uma vez o tokenizador, o etiquetador e o WordNet, que o
+    #   NLTK só carrega no primeiro uso (as stop words já são carregadas
+    #   na importação deste módulo)
+    #
+    to_tokenized(to_sentences('Preload the resources. Tag them.')[0])
+    nltk.pos_tag(['Preload', 'the', 'resources'])
+    WordNetLemmatizer().lemmatize('resources')
+
+
+def load_normalization_cache(path: str):
+    #
+    #   Carrega os caches de normalização salvos em disco, de forma que
+    #   processos novos (ex: workers do main) já comecem aquecidos
+    #   O arquivo fica no diretório dos artigos, que pode ser compartilhado,
+    #   então é JSON e apenas pares de texto são aceitos
+    #
+    if not os.path.isfile(path):
+        return
+
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            saved = json.load(file)
+
+        stems = [(word, value) for word, value in saved['stem']
+                 if isinstance(word, str) and isinstance(value, str)]
+        lemmas = [(word, value) for word, value in saved['lemma']
+                  if isinstance(word, str) and isinstance(value, str)]
+    except (OSError, ValueError, KeyError, TypeError):
+        return
+
+    stem_cache.update(stems)
+    lemma_cache.update(lemmas)
+
+
+def save_normalization_cache(path: str, min_unsaved: int = 1):
+    #
+    #   Regrava o cache apenas se houver ao menos min_unsaved palavras novas
+    #
+    if stem_cache.unsaved + lemma_cache.unsaved < min_unsaved:
+        return
+
+    # escrita atômica, vários processos podem salvar ao mesmo tempo
+    tmp_path = '%s.%d.tmp' % (path, os.getpid())
+
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump({
+            'stem': list(stem_cache.entries.items()),
+            'lemma': list(lemma_cache.entries.items()),
+        }, file)
+
+    os.replace(tmp_path, path)
+
+    stem_cache.unsaved = 0
+    lemma_cache.unsaved = 0
 
 
 # Regex para remover caracteres ilegais em XML
@@ -0,0 +1,84 @@
+import os
+import time
+
+
+def is_complete_pdf(path: str) -> bool:
+    #
+    #   Um PDF completo termina com o marcador %%EOF (seguido, no máximo,
+    #   de alguns bytes de espaço), arquivos ainda sendo copiados não
+    #
+    try:
+        with open(path, 'rb') as file:
+            file.seek(0, os.SEEK_END)
+            file.seek(max(0, file.tell() - 1024))
+
+            return b'%%EOF' in file.read()
+    except OSError:
+        return False
+
+
+#
+#   Observa um diretório por polling, reportando PDFs novos ou
+#   modificados somente depois que o tamanho e a data de modificação
+#   ficam estáveis por `settle` segundos (arquivos ainda sendo escritos
+#   são ignorados até terminarem), além dos PDFs removidos
+#
+class DirectoryWatcher:
+    directory_path: str
+    settle: float
+
+    def __init__(self, directory_path: str, settle: float = 2.0):
+        self.directory_path = directory_path
+        self.settle = settle
+
+        # arquivo -> (assinatura, momento em que foi vista pela primeira vez)
+        self._seen: dict[str, tuple[tuple[int, int], float]] = dict()
+        # arquivo -> assinatura já reportada
+        self._reported: dict[str, tuple[int, int]] = dict()
+        # PDFs encontrados no último polling
+        self._present: set[str] = set()
+
+    def poll(self) -> tuple[list[str], list[str]]:
+        now = time.monotonic()
+        ready, present = [], set()
+
+        for archive in os.listdir(self.directory_path):
+            if not archive.endswith('.pdf'):
+                continue
+
+            try:
+                stat = os.stat(os.path.join(self.directory_path, archive))
+            except OSError:
+                continue
+
+            present.add(archive)
+            signature = (stat.st_size, stat.st_mtime_ns)
+
+            if self._reported.get(archive) == signature:
+                continue
+
+            seen = self._seen.get(archive)
+
+            if seen is None or seen[0] != signature:
+                self._seen[archive] = (signature, now)
+                continue
+
+            if now - seen[1] < self.settle:
+                continue
+
+            if not is_complete_pdf(os.path.join(self.directory_path, archive)):
+                continue
+
+            self._reported[archive] = signature
+            del self._seen[archive]
+            ready.append(archive)
+
+        removed = sorted(self._present - present)
+
+        for archive in removed:
+            self._reported.pop(archive, None)
+            self._seen.pop(archive, None)
+
+        self._present = present
+
+        return ready, removed